@@ -1,25 +1,41 @@
 import streamlit as st
 from datetime import datetime
-import json
-import time
+
+from forum_boards import BOARDS, REPORT_REASONS
+from post_store import PostStore, post_key_for
 
 st.set_page_config(page_title="eBay Community - Test Board", page_icon="💬", layout="wide")
 
 # ================================
-# SESSION STATE INITIALIZATION
+# SHARED POST STORE
 # ================================
 
-if 'forum_posts' not in st.session_state:
-    st.session_state.forum_posts = {}
+@st.cache_resource
+def get_post_store():
+    """Open the post store shared with the Moderator Dashboard"""
+    return PostStore()
+
+post_store = get_post_store()
+
+# Seconds the footer's store-wide post count is reused for
+POST_COUNT_SECONDS = 30
 
-if 'ebay_forum_posts_v1' not in st.session_state:
-    st.session_state['ebay_forum_posts_v1'] = {}
+@st.cache_data(ttl=POST_COUNT_SECONDS)
+def store_post_count():
+    """Posts in the shared store, counted at most once per POST_COUNT_SECONDS per process"""
+    return post_store.count_posts()
+
+# ================================
+# SESSION STATE INITIALIZATION
+# ================================
 
-if 'posts_sync_timestamp' not in st.session_state:
-    st.session_state['posts_sync_timestamp'] = datetime.now().timestamp()
+# Page-start cursors per (board, status, sort) feed selection; the last one is the page on screen
+if 'feed_cursors' not in st.session_state:
+    st.session_state.feed_cursors = {}
 
-if 'save_trigger' not in st.session_state:
-    st.session_state.save_trigger = 0
+# Every rerun pages the feed straight from the store, so a new session
+# reads one page of posts rather than the whole store
+FEED_PAGE_SIZE = 20
 
 # Custom CSS
 st.markdown("""
@@ -93,87 +109,7 @@ st.markdown("""
 st.markdown('<div class="main-header"><h1>🛒 eBay Community - Forums</h1></div>', unsafe_allow_html=True)
 
 st.markdown("### 💬 Welcome to the eBay Community Test Board")
-st.success("✨ **LIVE CONNECTION:** Posts sync to Moderator Dashboard via storage!")
-
-# Storage save/load component
-all_posts_list = list(st.session_state.forum_posts.values())
-all_posts_json = json.dumps(all_posts_list)
-
-st.components.v1.html(f"""
-<script>
-// Save all posts to storage
-async function saveAllPosts() {{
-    const posts = {all_posts_json};
-    
-    if (!window.storage) {{
-        console.error('Storage API not available!');
-        return;
-    }}
-    
-    let savedCount = 0;
-    for (const post of posts) {{
-        try {{
-            await window.storage.set('forum_post_' + post.id, JSON.stringify(post), true);
-            savedCount++;
-        }} catch (e) {{
-            console.error('Failed to save post', post.id, e);
-        }}
-    }}
-    
-    if (savedCount > 0) {{
-        console.log('📤 Saved', savedCount, 'posts to storage');
-    }}
-}}
-
-// Load all posts from storage
-async function loadAllPosts() {{
-    if (!window.storage) {{
-        console.error('Storage API not available!');
-        return;
-    }}
-    
-    try {{
-        const keys = await window.storage.list('forum_post_', true);
-        
-        if (keys && keys.keys) {{
-            console.log('📥 Found', keys.keys.length, 'posts in storage');
-            
-            for (const key of keys.keys) {{
-                try {{
-                    const result = await window.storage.get(key, true);
-                    if (result && result.value) {{
-                        const post = JSON.parse(result.value);
-                        console.log('Loaded post:', post.id);
-                    }}
-                }} catch (e) {{
-                    console.error('Error loading', key, e);
-                }}
-            }}
-        }}
-    }} catch (e) {{
-        console.error('Load error:', e);
-    }}
-}}
-
-// Auto-save on page load
-saveAllPosts();
-
-console.log('✅ Storage system ready');
-</script>
-""", height=0)
-
-# eBay Boards
-BOARDS = [
-    "Selling", "Buying", "Payments", "Postage & Shipping",
-    "Technical Issues", "Member to Member Support",
-    "Mentors Forum", "General Discussion", "eBay Café"
-]
-
-# Report reasons
-REPORT_REASONS = [
-    "Naming & Shaming", "Disrespectful Language", "Personal Information Shared",
-    "Spam or Advertising", "Off-Topic Content", "Wrong Board", "Other Policy Violation"
-]
+st.success("✨ **LIVE CONNECTION:** Posts are shared with the Moderator Dashboard through the post store!")
 
 # Post submission form
 st.markdown("---")
@@ -219,15 +155,11 @@ with st.form("new_post_form"):
                 "ai_analyzed": False
             }
             
-            # Save to session state
-            storage_key = f"forum_post_{post_id}"
-            st.session_state.forum_posts[storage_key] = post_data
-            st.session_state['ebay_forum_posts_v1'][storage_key] = post_data
-            st.session_state['posts_sync_timestamp'] = datetime.now().timestamp()
-            st.session_state.save_trigger += 1  # Trigger re-render to save
+            # Save to the shared store
+            post_store.upsert_posts([post_data])
             
             st.success(f"✅ Post submitted to **{board}** board!")
-            st.info("💾 Post is auto-saving to storage... Check browser console (F12) for confirmation.")
+            st.info("💾 Post saved to the shared post store.")
             st.balloons()
             
             # Show what moderators will see
@@ -239,7 +171,7 @@ with st.form("new_post_form"):
                 **Status:** 🟡 Pending Review  
                 **Content:** {post_content}
                 
-                *Refresh this page and the Moderator Dashboard to see the synced post.*
+                *Refresh the Moderator Dashboard to see the analyzed post.*
                 """)
             
         else:
@@ -259,27 +191,25 @@ with col3:
     sort_order = st.selectbox("Sort by", ["Newest First", "Oldest First", "Most Reports"], key="sort_order")
 
 # Show posts
-if st.session_state.forum_posts:
-    # Apply filters
-    filtered_posts = list(st.session_state.forum_posts.values())
-    
-    if filter_board != "All Boards":
-        filtered_posts = [p for p in filtered_posts if p.get('board') == filter_board]
-    
-    if filter_status != "All Status":
-        filtered_posts = [p for p in filtered_posts if p.get('status', 'pending').lower() == filter_status.lower()]
-    
-    # Sort
-    if sort_order == "Newest First":
-        filtered_posts.sort(key=lambda x: x['timestamp'], reverse=True)
-    elif sort_order == "Oldest First":
-        filtered_posts.sort(key=lambda x: x['timestamp'])
-    else:  # Most Reports
-        filtered_posts.sort(key=lambda x: len(x.get('reports', [])), reverse=True)
-    
-    st.info(f"📊 Showing {len(filtered_posts)} post(s)")
+feed_board = None if filter_board == "All Boards" else filter_board
+feed_status = None if filter_status == "All Status" else filter_status.lower()
+feed_order = {"Newest First": "newest", "Oldest First": "oldest"}.get(sort_order, "most_reported")
+cursors = st.session_state.feed_cursors.setdefault((feed_board, feed_status, feed_order), [None])
+# Apply filters (each page is one indexed seek from where the previous page ended)
+page_posts, next_cursor = post_store.query_posts(status=feed_status, board=feed_board, order=feed_order,
+                                                 limit=FEED_PAGE_SIZE, after=cursors[-1])
+if not page_posts and len(cursors) > 1:
+    # Posts on this page left the filter since it was opened; start over
+    del cursors[1:]
+    page_posts, next_cursor = post_store.query_posts(status=feed_status, board=feed_board, order=feed_order,
+                                                     limit=FEED_PAGE_SIZE)
+
+if page_posts:
+    page = len(cursors) - 1
+    first = page * FEED_PAGE_SIZE + 1
+    st.info(f"📊 Showing posts {first}–{first + len(page_posts) - 1} • Page {page + 1}")
     
-    for post in filtered_posts[:20]:  # Show last 20 posts
+    for post in page_posts:
         # Determine status styling
         status = post.get('status', 'pending')
         if status == 'approved':
@@ -363,13 +293,9 @@ if st.session_state.forum_posts:
                         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     }
                     
-                    # Add reply to post
-                    storage_key = f"forum_post_{post['id']}"
-                    if storage_key in st.session_state.forum_posts:
-                        if 'replies' not in st.session_state.forum_posts[storage_key]:
-                            st.session_state.forum_posts[storage_key]['replies'] = []
-                        st.session_state.forum_posts[storage_key]['replies'].append(reply_data)
-                        st.session_state.save_trigger += 1  # Trigger save
+                    # Add reply to post (only the replies list is written, not the whole post)
+                    storage_key = post_key_for(post)
+                    post_store.add_replies({storage_key: reply_data})
                     
                     st.session_state[f'show_reply_{post["id"]}'] = False
                     st.success("✅ Reply posted!")
@@ -402,12 +328,9 @@ if st.session_state.forum_posts:
                             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                         }
                         
-                        # Add report to post
-                        storage_key = f"forum_post_{post['id']}"
-                        if storage_key in st.session_state.forum_posts:
-                            st.session_state.forum_posts[storage_key]['reports'].append(report_data)
-                            st.session_state.forum_posts[storage_key]['report_count'] += 1
-                            st.session_state.save_trigger += 1  # Trigger save
+                        # Add report to post (only the reports list and count are written)
+                        storage_key = post_key_for(post)
+                        post_store.add_reports({storage_key: report_data})
                         
                         st.session_state[f'show_report_{post["id"]}'] = False
                         st.success("✅ Report submitted!")
@@ -418,6 +341,19 @@ if st.session_state.forum_posts:
                         st.rerun()
         
         st.markdown("---")
+    
+    # Page navigation
+    col_prev, _, col_next = st.columns([1, 4, 1])
+    with col_prev:
+        if st.button("◀ Previous", key="feed_prev", disabled=page == 0):
+            cursors.pop()
+            st.rerun()
+    with col_next:
+        if st.button("Next ▶", key="feed_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+elif feed_board or feed_status:
+    st.info("📭 No posts match these filters.")
 else:
     st.info("📭 No posts yet. Submit a post using the form above!")
 
@@ -426,8 +362,7 @@ st.markdown("---")
 st.markdown(f"""
 <div style='text-align: center; color: #707070; padding: 20px;'>
     <p>🔒 This is a test environment for AI moderation demonstration</p>
-    <p>✨ <strong>{len(st.session_state.forum_posts)} post(s) in session</strong> • Auto-sync enabled</p>
-    <p>💾 Press F12 to open browser console and see storage logs</p>
-    <p>🔄 Refresh page to re-sync all posts to storage</p>
+    <p>✨ <strong>{store_post_count()} post(s) in the shared store</strong> • Auto-sync enabled</p>
+    <p>💾 Posts are saved to the local SQLite post store as soon as they change</p>
 </div>
 """, unsafe_allow_html=True)
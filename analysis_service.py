@@ -0,0 +1,243 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from duplicate_detection import DuplicateScreen
+from moderation_engine import build_result, current_engine
+from perf_metrics import RuleStats
+
+logger = logging.getLogger(__name__)
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# 0 workers means posts are analyzed synchronously inside submit()
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', os.cpu_count() or 2))
+ANALYSIS_QUEUE_SIZE = int(os.environ.get('ANALYSIS_QUEUE_SIZE', 10000))
+ANALYSIS_CHUNK_SIZE = int(os.environ.get('ANALYSIS_CHUNK_SIZE', 200))
+ANALYSIS_USE_PROCESSES = os.environ.get('ANALYSIS_USE_PROCESSES', '1') == '1'
+# Seconds a claimed pending post is reserved for this process's analysis
+ANALYSIS_LEASE_SECONDS = float(os.environ.get('ANALYSIS_LEASE_SECONDS', 300))
+
+# ================================
+# WORKER SIDE
+# ================================
+
+def init_worker():
+    """Compile the rules file once per worker; later edits are picked up per chunk"""
+    current_engine()
+
+
+def analyze_chunk(chunk, timed=False):
+    """Detect violations for a list of (post_key, post) pairs inside a worker
+
+    Returns ([(post_key, violations)], per-rule counts or None when untimed,
+    fingerprint of the rules that were applied).
+    """
+    engine = current_engine()
+    rule_stats = RuleStats() if timed else None
+    contents = [post['content'] for _, post in chunk]
+    detected = list(zip((post_key for post_key, _ in chunk), engine.detect_many(contents, rule_stats)))
+    return detected, rule_stats and rule_stats.counts, engine.fingerprint
+
+
+# ================================
+# BACKGROUND ANALYSIS SERVICE
+# ================================
+
+class AnalysisService:
+    """Bounded job queue feeding a thread or process pool of rule engines
+
+    submit_pending() claims pending posts in the store, so several
+    processes can share one store without analyzing a post twice, and
+    never blocks the caller: posts beyond the queue bound stay pending for
+    a later call. Each chunk first passes the duplicate screen, so exact
+    reposts reuse cached violations and near-duplicates gain a Duplicate
+    violation. Results are written to the post store, and its decision
+    log, as each chunk completes.
+    """
+
+    def __init__(self, store, workers=ANALYSIS_WORKERS, max_queued=ANALYSIS_QUEUE_SIZE,
+                 chunk_size=ANALYSIS_CHUNK_SIZE, use_processes=ANALYSIS_USE_PROCESSES, screen=None, metrics=None):
+        self.store = store
+        self.screen = screen or DuplicateScreen()
+        self.metrics = metrics
+        self.workers = workers
+        self.use_processes = use_processes
+        self.chunk_size = chunk_size
+        self.jobs = queue.Queue(maxsize=max_queued)
+        self.lock = threading.Lock()
+        self.tracked = set()
+        self.in_flight = 0
+        self.done = 0
+        self.failed = 0
+
+        if workers <= 0:
+            self.executor = None
+            init_worker()
+            return
+
+        self.executor = self.make_executor()
+
+        # At most two chunks per worker are handed to the pool at once
+        self.slots = threading.Semaphore(workers * 2)
+        self.dispatcher = threading.Thread(target=self.dispatch, name='analysis-dispatcher', daemon=True)
+        self.dispatcher.start()
+
+    def make_executor(self):
+        """A new worker pool"""
+        # Only fork works under Streamlit: spawn and forkserver re-import the
+        # running script as __main__, which would start a dashboard per worker
+        if self.use_processes and 'fork' in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_worker, mp_context=multiprocessing.get_context('fork')
+            )
+        return ThreadPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def restart_pool(self):
+        """Replace a pool that lost a worker; its unfinished chunks fail and are retried"""
+        broken, self.executor = self.executor, self.make_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def pending_limit(self):
+        """How many pending posts are worth claiming: the free queue room"""
+        return self.jobs.maxsize - self.jobs.qsize()
+
+    def submit_pending(self):
+        """Claim pending posts from the store and queue them; returns how many were accepted"""
+        return self.submit_claimed(self.store.claim_pending(self.pending_limit(), ANALYSIS_LEASE_SECONDS))
+
+    def submit_claimed(self, posts):
+        """Queue {post_key: post} this process has claimed in the store; returns how many were accepted"""
+        accepted = self.submit(posts)
+        if accepted < len(posts):
+            # Claims the queue had no room for go straight back to the store
+            with self.lock:
+                unqueued = [post_key for post_key in posts if post_key not in self.tracked]
+            self.store.release_claims(unqueued)
+        return accepted
+
+    def submit(self, posts):
+        """Queue {post_key: post} for analysis; returns how many were accepted"""
+        if self.executor is None:
+            chunk = list(posts.items())[:self.jobs.maxsize]
+            if chunk:
+                with self.lock:
+                    self.in_flight += len(chunk)
+                self.process(chunk)
+            return len(chunk)
+
+        accepted = 0
+        for post_key, post in posts.items():
+            with self.lock:
+                if post_key in self.tracked:
+                    continue
+                self.tracked.add(post_key)
+            try:
+                self.jobs.put_nowait((post_key, post))
+            except queue.Full:
+                with self.lock:
+                    self.tracked.discard(post_key)
+                break
+            accepted += 1
+        return accepted
+
+    def dispatch(self):
+        """Group queued posts into chunks and hand them to the pool"""
+        while True:
+            chunk = [self.jobs.get()]
+            while len(chunk) < self.chunk_size:
+                try:
+                    chunk.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.slots.acquire()
+            with self.lock:
+                self.in_flight += len(chunk)
+            try:
+                self.process(chunk)
+            except Exception as exc:
+                # The dispatcher must outlive any one chunk, or analysis stalls for good
+                logger.exception("Could not hand %d posts to the analysis pool", len(chunk))
+                self.release(chunk, succeeded=False)
+                if isinstance(exc, BrokenExecutor):
+                    self.restart_pool()
+
+    def process(self, chunk):
+        """Screen a chunk for reposts and analyze whatever is left"""
+        try:
+            ready, todo, duplicates = self.screen.prepare(chunk)
+        except Exception:
+            logger.exception("Duplicate screening failed for %d posts", len(chunk))
+            self.release(chunk, succeeded=False)
+            return
+
+        timed = self.metrics is not None and self.metrics.enabled
+        if todo and self.executor is not None:
+            future = self.executor.submit(analyze_chunk, todo, timed)
+            future.add_done_callback(partial(self.publish, chunk, ready, duplicates))
+        else:
+            self.publish(chunk, ready, duplicates, todo=todo, timed=timed)
+
+    def publish(self, chunk, ready, duplicates, future=None, todo=(), timed=False):
+        """Store a finished chunk's results and release its posts, exactly once whatever fails"""
+        succeeded = False
+        try:
+            detected, rule_counts, fingerprint = future.result() if future is not None else analyze_chunk(todo, timed)
+            if rule_counts:
+                self.metrics.merge_rules(rule_counts)
+            posts = dict(chunk)
+            self.screen.remember(posts, detected, fingerprint)
+
+            results = {}
+            for post_key, violations in ready + detected:
+                violations = violations + duplicates.get(post_key, [])
+                results[post_key] = build_result(posts[post_key]['id'], violations)
+
+            self.store.save_analysis(results)
+            succeeded = True
+        except Exception:
+            # Handled here, as publish may run inline from dispatch, which must not release the chunk again
+            logger.exception("Could not analyze or store %d posts", len(chunk))
+        finally:
+            self.release(chunk, succeeded)
+
+    def release(self, chunk, succeeded):
+        """Update counters once a chunk is finished"""
+        with self.lock:
+            self.in_flight -= len(chunk)
+            if succeeded:
+                self.done += len(chunk)
+            else:
+                self.failed += len(chunk)
+            self.tracked.difference_update(post_key for post_key, _ in chunk)
+        if self.executor is not None:
+            self.slots.release()
+        if not succeeded:
+            # Failed posts stay pending in the store; dropping their claims lets the next submit_pending retry them
+            self.store.release_claims(post_key for post_key, _ in chunk)
+
+    def close(self):
+        """Stop the worker pool; queued posts go back to the store's pending queue"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        with self.lock:
+            unfinished = list(self.tracked)
+        self.store.release_claims(unfinished)
+
+    def progress(self):
+        """Queued, in-flight, done and failed post counts plus repost cache hits"""
+        with self.lock:
+            return {
+                'queued': self.jobs.qsize(),
+                'in_flight': self.in_flight,
+                'done': self.done,
+                'failed': self.failed,
+                'cache_hits': self.screen.cache.hits,
+            }
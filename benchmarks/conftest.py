@@ -0,0 +1,108 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import pytest
+
+from benchmarks.corpus import generate_posts
+
+# ================================
+# BENCHMARK CONFIGURATION
+# ================================
+
+# Corpus sizes to run; the full ladder is 1000,10000,100000,1000000
+BENCH_SIZES = [int(size) for size in os.environ.get('BENCH_SIZES', '1000,10000').split(',')]
+BENCH_SEED = int(os.environ.get('BENCH_SEED', 0))
+BENCH_RESULTS = os.environ.get('BENCH_RESULTS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl'))
+
+RESULTS = []
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        metafunc.parametrize('size', BENCH_SIZES)
+
+
+@lru_cache(maxsize=1)
+def cached_corpus(size, seed):
+    return list(generate_posts(size, seed=seed))
+
+
+@pytest.fixture
+def corpus(size):
+    """The synthetic corpus for this size (generation is not timed)"""
+    return cached_corpus(size, BENCH_SEED)
+
+
+def git_revision():
+    """Short commit hash of the tree being measured, marked when it has local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}+dirty" if dirty else commit
+
+
+# ================================
+# TIMING AND RESULTS
+# ================================
+
+@pytest.fixture
+def bench(request):
+    """Time one call of func and record it as benchmark (name, size)
+
+    ops is how many operations the call performed, for the per-op time.
+    """
+    def run(size, func, ops=None):
+        name = request.node.originalname
+        started = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - started
+        RESULTS.append({
+            'benchmark': name,
+            'size': size,
+            'seconds': round(seconds, 6),
+            'per_op_us': round(seconds / (ops or size) * 1e6, 3),
+        })
+        return value
+    return run
+
+
+def previous_results(path, revision):
+    """Latest earlier (benchmark, size) -> result recorded for a different commit"""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path) as results_file:
+        for line in results_file:
+            record = json.loads(line)
+            if record['commit'] != revision:
+                previous[(record['benchmark'], record['size'])] = record
+    return previous
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not RESULTS:
+        return
+    revision = git_revision()
+    previous = previous_results(BENCH_RESULTS, revision)
+    stamp = datetime.now().isoformat(timespec='seconds')
+
+    terminalreporter.section(f"benchmarks @ {revision}")
+    with open(BENCH_RESULTS, 'a') as results_file:
+        for result in RESULTS:
+            record = dict(result, commit=revision, recorded=stamp, python=platform.python_version())
+            results_file.write(json.dumps(record) + '\n')
+
+            line = f"{result['benchmark']:<32} {result['size']:>9,} {result['seconds']:>10.3f}s {result['per_op_us']:>10.2f}us/op"
+            earlier = previous.get((result['benchmark'], result['size']))
+            if earlier:
+                change = (result['per_op_us'] / earlier['per_op_us'] - 1) * 100 if earlier['per_op_us'] else 0
+                line += f"   {change:+6.1f}% vs {earlier['commit']}"
+            terminalreporter.write_line(line)
+    terminalreporter.write_line(f"results appended to {BENCH_RESULTS}")
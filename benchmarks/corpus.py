@@ -0,0 +1,138 @@
+import random
+from datetime import datetime, timedelta
+
+from forum_boards import BOARDS, REPORT_REASONS
+
+# ================================
+# SYNTHETIC FORUM CORPUS
+# ================================
+
+# Keywords as first shipped in moderation_rules.json, copied here so the
+# corpus stays the same across commits when the rules file is edited
+NEGATIVE_WORDS = ['scam', 'scammer', 'fraud', 'terrible', 'awful', 'worst', 'avoid', 'cheat']
+INSULTS = ['idiot', 'stupid', 'dumb', 'moron', 'fool']
+SPAM_DOMAINS = ['amazon.com', 'amazon.co.uk', 'etsy.com']
+
+# Share of posts carrying each kind of content; the rest are clean
+DEFAULT_MIX = {
+    'pii': 0.08,
+    'naming': 0.07,
+    'profanity': 0.05,
+    'insult': 0.07,
+    'spam': 0.05,
+}
+
+CORPUS_START = datetime(2025, 1, 1)
+CORPUS_DAYS = 365
+
+TOPICS = [
+    "Item arrived damaged", "Payment on hold", "Tracking not updating", "Listing was removed",
+    "Best way to ship a guitar", "Return request question", "Fees changed this month",
+    "Account verification loop", "Promoted listings worth it?", "Buyer asking for refund",
+]
+
+SENTENCES = [
+    "I listed the item last week and it still has no views.",
+    "The parcel left the depot on Monday but tracking has not moved since.",
+    "Has anyone else had the same problem with the new checkout?",
+    "I contacted support twice and got two different answers.",
+    "Would a larger box with more padding have helped here?",
+    "The payment shows as pending even though the buyer paid.",
+    "Any tips for photographing shiny items without glare?",
+    "I opened a return but the label never arrived by email.",
+    "Thanks in advance for any advice, this board has been really helpful.",
+    "Is it better to offer free postage and raise the price instead?",
+]
+
+PROFANE_WORDS = ['f*ck', 'f@ck', 'sh*t', 'sh!t', 'd@mn', 'd*mn', 'b*tch', 'b!tch']
+
+
+def random_username(rng):
+    """A forum-style username"""
+    return f"{rng.choice(['seller', 'buyer', 'collector', 'trader', 'member'])}_{rng.randrange(10000):04d}"
+
+
+def pii_sentence(rng):
+    """A sentence sharing a phone number, email address or postcode"""
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"Call me on 0{rng.randrange(1, 10)}{rng.randrange(10 ** 8, 10 ** 9)} to sort it out."
+    if kind == 1:
+        return f"Email me at {random_username(rng)}@example.com with the details."
+    return f"Collect it from SW{rng.randrange(1, 20)} {rng.randrange(10)}AB any weekday."
+
+
+def naming_sentence(rng):
+    """A sentence calling out another member next to a negative word"""
+    return f"Watch out for {rng.choice(['seller', 'buyer'])} {random_username(rng)}, total {rng.choice(NEGATIVE_WORDS)}."
+
+
+def profanity_sentence(rng):
+    """A sentence with masked profanity"""
+    return f"This {rng.choice(PROFANE_WORDS)} courier lost another parcel."
+
+
+def insult_sentence(rng):
+    """A sentence insulting another member"""
+    return f"Only a {rng.choice(INSULTS)} would ship without tracking."
+
+
+def spam_sentence(rng):
+    """A sentence pointing buyers at an outside marketplace"""
+    return f"Same item is cheaper on {rng.choice(SPAM_DOMAINS)} if you look."
+
+
+VIOLATION_SENTENCES = {
+    'pii': pii_sentence,
+    'naming': naming_sentence,
+    'profanity': profanity_sentence,
+    'insult': insult_sentence,
+    'spam': spam_sentence,
+}
+
+
+def generate_posts(count, seed=0, mix=None, start=CORPUS_START, days=CORPUS_DAYS):
+    """Yield count posts in the Forum App's post_data schema
+
+    The same seed, mix and count always produce the same posts. Each post
+    independently picks up every kind of violation with the probability
+    in mix, and timestamps are spread evenly over days from start.
+    """
+    rng = random.Random(seed)
+    mix = DEFAULT_MIX if mix is None else mix
+    step = days * 86400 / max(count, 1)
+
+    for i in range(count):
+        sentences = rng.sample(SENTENCES, rng.randint(1, 3))
+        for kind, share in mix.items():
+            if rng.random() < share:
+                sentences.insert(rng.randrange(len(sentences) + 1), VIOLATION_SENTENCES[kind](rng))
+
+        posted = start + timedelta(seconds=int(i * step))
+        timestamp = posted.strftime('%Y-%m-%d %H:%M:%S')
+        reports = [
+            {
+                "reporter": random_username(rng),
+                "reason": rng.choice(REPORT_REASONS),
+                "additional_info": "",
+                "timestamp": timestamp
+            }
+            for _ in range(rng.choices((0, 1, 2, 3), weights=(85, 10, 4, 1))[0])
+        ]
+
+        yield {
+            "id": f"{posted.strftime('%Y%m%d_%H%M%S')}_{i:07d}",
+            "username": random_username(rng),
+            "board": rng.choice(BOARDS),
+            "title": rng.choice(TOPICS),
+            "content": ' '.join(sentences),
+            "timestamp": timestamp,
+            "status": "pending",
+            "source": "synthetic",
+            "report_count": len(reports),
+            "reports": reports,
+            "replies": [],
+            "moderation_note": "",
+            "violations": [],
+            "ai_analyzed": False
+        }
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import time
+from itertools import islice
+
+from benchmarks.corpus import generate_posts
+
+# ================================
+# INGEST LOAD GENERATOR
+# ================================
+#
+#   python ingest_server.py &
+#   python -m benchmarks.loadgen --posts 20000 --concurrency 16 --batch-size 20
+#
+# Every request waits for its decisions (?wait=1), so the measured time is
+# ingest-to-decision latency. 429 responses are retried after Retry-After.
+
+
+async def post_batch(reader, writer, host, batch):
+    """Send one batch on a keep-alive connection; (status, headers, body)"""
+    body = json.dumps(batch).encode('utf-8')
+    writer.write(
+        f"POST /posts?wait=1 HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    payload = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, json.loads(payload)
+
+
+async def client(host, port, batches, latencies, counts):
+    """Send batches from the shared iterator until it runs dry"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for batch in batches:
+            while True:
+                started = time.perf_counter()
+                status, headers, payload = await post_batch(reader, writer, host, batch)
+                if status == 429:
+                    counts['throttled'] += 1
+                    await asyncio.sleep(float(headers.get('retry-after', 1)))
+                    continue
+                break
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+                counts['decided'] += len(payload['decisions'])
+            else:
+                counts[f'http_{status}'] += 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, total, concurrency, batch_size, seed):
+    posts = generate_posts(total, seed=seed)
+    batches = iter(lambda: list(islice(posts, batch_size)), [])
+    latencies, counts = [], {'decided': 0, 'throttled': 0}
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, batches, latencies, counts) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000 if latencies else 0.0
+
+    print(f"posts decided: {counts['decided']:,} in {elapsed:.1f}s ({counts['decided'] / elapsed:,.0f} posts/s)")
+    print(f"ingest-to-decision latency per request: p50 {percentile(0.5):.1f} ms, p99 {percentile(0.99):.1f} ms")
+    print(f"throttled (429) responses: {counts['throttled']:,}")
+    for key, value in counts.items():
+        if key.startswith('http_'):
+            print(f"{key}: {value:,}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the ingest server with synthetic posts")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=8, help="parallel keep-alive connections")
+    parser.add_argument('--batch-size', type=int, default=10, help="posts per request")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.host, args.port, args.posts, args.concurrency, args.batch_size, args.seed))
+
+
+if __name__ == '__main__':
+    main()
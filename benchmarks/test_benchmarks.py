@@ -0,0 +1,172 @@
+import time
+from datetime import datetime, timedelta
+
+from analysis_service import AnalysisService
+from benchmarks.corpus import CORPUS_DAYS, CORPUS_START
+from moderation_engine import RuleEngine
+from moderation_stats import EventSink, ModerationStats
+from post_store import PostStore, post_key_for
+from queue_index import needs_review
+from shared_state import SharedModeration
+
+# Each benchmark times one full pass over the synthetic corpus of the
+# parametrized size; see conftest.py for sizes and the results file.
+
+
+def posted_at(post):
+    return datetime.strptime(post['timestamp'], '%Y-%m-%d %H:%M:%S')
+
+
+def analyzed_stats(corpus):
+    """ModerationStats holding the analysis log for a whole corpus"""
+    engine, stats = RuleEngine(), ModerationStats()
+    sink = EventSink(stats)
+    for post in corpus:
+        sink.analysis(post['id'], post['username'], engine.analyze(post['content'], post['id']), posted_at(post))
+    sink.flush()
+    return stats
+
+
+# ================================
+# ANALYSIS
+# ================================
+
+def test_analyze_post_ultra_strict(size, corpus, bench):
+    """The dashboard's per-post path: pure analysis, then batched logging"""
+    engine, stats = RuleEngine(), ModerationStats()
+    sink = EventSink(stats)
+
+    def analyze_all():
+        for post in corpus:
+            result = engine.analyze(post['content'], post['id'])
+            sink.analysis(post['id'], post['username'], result, posted_at(post))
+        sink.flush()
+        return stats
+
+    bench(size, analyze_all)
+    assert len(stats.action_log) == size
+
+
+# ================================
+# STATS AND PROFILES
+# ================================
+
+def test_get_stats_for_period(size, corpus, bench):
+    """Sidebar period queries (day, week, month, whole corpus) over a populated log"""
+    stats = analyzed_stats(corpus)
+    end = CORPUS_START + timedelta(days=CORPUS_DAYS - 1)
+    periods = [(end - timedelta(days=days), end) for days in (0, 1, 7, 30, CORPUS_DAYS - 1)]
+    repeats = 200
+
+    def query_all():
+        for _ in range(repeats):
+            for start_date, end_date in periods:
+                totals = stats.get_stats_for_period(start_date, end_date)
+        return totals
+
+    totals = bench(size, query_all, ops=repeats * len(periods))
+    assert totals['total_actions'] == size
+
+
+def test_update_user_profile(size, corpus, bench):
+    """Profile updates for every post, violation and action in the corpus"""
+    source = analyzed_stats(corpus)
+    events = [(post['username'], 'post', {}, None) for post in corpus]
+    events += [(entry['username'], 'violation', entry, position) for position, entry in enumerate(source.violation_log)]
+    events += [(entry['username'], 'action', entry, position) for position, entry in enumerate(source.action_log)]
+    stats = ModerationStats()
+
+    def update_all():
+        for username, event_type, event_data, position in events:
+            stats.update_user_profile(username, event_type, event_data, position)
+
+    bench(size, update_all, ops=len(events))
+    assert sum(profile.total_posts for profile in stats.user_profiles.values()) == size
+
+
+# ================================
+# REVIEW QUEUE
+# ================================
+
+def review_posts(corpus):
+    """The corpus as analyzed posts, plus a new report on every tenth, both as {post_key: post}"""
+    engine = RuleEngine()
+    results = [engine.analyze(post['content'], post['id']) for post in corpus]
+    posts = {}
+    for post, result in zip(corpus, results):
+        post = dict(post, ai_analyzed=True, **{field: result[field] for field in
+                    ('overall_status', 'confidence', 'priority', 'violations_detected')})
+        posts[post_key_for(post)] = post
+    reported = {post_key: dict(post, reports=post['reports'] + [{'reporter': 'bench'}])
+                for post_key, post in list(posts.items())[::10]}
+    return posts, reported
+
+
+def test_review_queue(size, corpus, bench):
+    """Filing analyzed posts for review, a new report on every tenth, then claiming and handling each in turn"""
+    posts, reported = review_posts(corpus)
+    shared = SharedModeration()
+
+    def review_all():
+        shared.file_for_review(posts)
+        shared.file_for_review(reported)
+        handled = 0
+        post_key = shared.claim_next('bench')
+        while post_key is not None:
+            shared.complete(post_key, 'bench', 'overridden')
+            handled += 1
+            post_key = shared.claim_next('bench')
+        return handled
+
+    handled = bench(size, review_all, ops=len(posts) + len(reported))
+    assert handled == sum(map(needs_review, {**posts, **reported}.values())) and not len(shared.review_queue)
+
+
+# ================================
+# AUTO-ANALYZE SYNC LOOP
+# ================================
+
+def test_sync_loop(size, corpus, bench, tmp_path):
+    """The dashboard's sync_posts loop until every stored post is analyzed
+
+    Posts are written to a fresh store up front; the timed part files
+    changes in the shared queue columns, claims pending posts for the
+    analysis service and logs the store's new decisions, as dashboard
+    sessions would across reruns.
+    """
+    store = PostStore(str(tmp_path / 'bench.db'))
+    for offset in range(0, size, 10000):
+        store.upsert_posts(corpus[offset:offset + 10000])
+
+    service = AnalysisService(store)
+    shared = SharedModeration()
+    sink = EventSink(shared)
+
+    def sync_until_analyzed():
+        analyzed = 0
+        while analyzed < size:
+            if shared.pull_posts(store):
+                service.submit_pending()
+
+            decisions = shared.take_decisions(store)
+            for post_key, post_id, username, result, decided_at in decisions:
+                sink.analysis(post_id, username, result, decided_at)
+                sink.post(post_key, username, decided_at)
+            sink.flush()
+            if decisions:
+                shared.pull_posts(store)
+            analyzed += len(decisions)
+
+            assert service.progress()['failed'] == 0
+            if not decisions:
+                time.sleep(0.005)
+
+    try:
+        bench(size, sync_until_analyzed)
+    finally:
+        service.close()
+
+    assert store.count_posts() == size
+    assert not store.pending_analysis(limit=1)
+    queue_index = shared.queue_index
+    assert queue_index.count('approved') + queue_index.count('flagged') == len({post_key_for(post) for post in corpus})
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from moderation_engine import current_engine
+from text_normalization import normalize_text
+
+# ================================
+# CONFIGURATION
+# ================================
+
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', 50000))
+DUPLICATE_WINDOW = int(os.environ.get('DUPLICATE_WINDOW', 20000))
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', 0.8))
+# Posts with fewer words are too generic ("thanks for the help") to call reposts
+DUPLICATE_MIN_TOKENS = int(os.environ.get('DUPLICATE_MIN_TOKENS', 8))
+# Most recent posts kept per LSH bucket, so templated text cannot grow a bucket with the window
+DUPLICATE_BUCKET_SIZE = int(os.environ.get('DUPLICATE_BUCKET_SIZE', 64))
+
+# MinHash hashes are computed modulo a prime just above 2**32
+HASH_PRIME = 4294967311
+
+
+def content_hash(content):
+    """Stable digest of the raw post content
+
+    Exact reposts must match character for character: rules are case and
+    whitespace sensitive, and cached PII spans index into the raw text.
+    Looser matches are left to the near-duplicate index.
+    """
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# ================================
+# EXACT REPOST CACHE
+# ================================
+
+class AnalysisCache:
+    """LRU map from (rules fingerprint, content hash) to the violations the rule engine found
+
+    Keys carry the rules fingerprint, so a rules file change makes every
+    older entry miss and age out.
+    """
+
+    def __init__(self, maxsize=ANALYSIS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached violations for key, or None"""
+        with self.lock:
+            violations = self.entries.get(key)
+            if violations is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return [dict(v) for v in violations]
+
+    def put(self, key, violations):
+        """Remember violations for key, evicting the least recently used"""
+        with self.lock:
+            self.entries[key] = [dict(v) for v in violations]
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+# ================================
+# NEAR-DUPLICATE INDEX (MinHash + LSH)
+# ================================
+
+class NearDuplicateIndex:
+    """MinHash signatures of recent posts bucketed by LSH bands and author
+
+    A repost is an author posting near-identical text again, so bucket
+    keys include the author and posts only match the same author's. Posts
+    shorter than min_tokens words are not indexed.
+
+    A lookup only compares against posts sharing at least one band
+    bucket, and each bucket keeps only its bucket_size most recent posts,
+    so insert cost stays bounded however similar the window's posts are.
+    The candidates are compared in one vectorized step. Posts older than
+    the window are evicted.
+    """
+
+    def __init__(self, window=DUPLICATE_WINDOW, threshold=DUPLICATE_THRESHOLD,
+                 num_perm=64, bands=16, shingle_size=3, bucket_size=DUPLICATE_BUCKET_SIZE,
+                 min_tokens=DUPLICATE_MIN_TOKENS):
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.window = window
+        self.threshold = threshold
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.min_tokens = max(min_tokens, shingle_size)
+        self.bucket_size = bucket_size
+        # Bucket members are dicts used as insertion-ordered sets, oldest first
+        self.buckets = [{} for _ in range(bands)]
+        # post_id -> (row in matrix, band keys), oldest first
+        self.signatures = OrderedDict()
+        self.matrix = np.zeros((window + 1, num_perm), dtype=np.uint64)
+        self.free_rows = list(range(window, -1, -1))
+        self.lock = threading.Lock()
+
+    def shingles(self, content):
+        """Overlapping n-grams of the post's folded words; none for posts under min_tokens words"""
+        words = normalize_text(content).tokens
+        if len(words) < self.min_tokens:
+            return set()
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, content):
+        """MinHash signature, or None for content too short to index"""
+        shingles = self.shingles(content)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % HASH_PRIME).min(axis=1)
+
+    def band_keys(self, signature, author=None):
+        """One hashable key per LSH band, scoped to the author"""
+        prefix = (author or '').encode('utf-8') + b'\0'
+        return [prefix + band.tobytes() for band in signature.reshape(self.bands, -1)]
+
+    def insert(self, post_id, content, author=None):
+        """Index a post and return [(post_id, similarity)] of earlier near-duplicates, best first
+
+        Buckets are checked band by band and the search stops at the first
+        band whose bucket holds a near-duplicate, so a repost of a common
+        text costs one bucket comparison.
+        """
+        signature = self.signature(content)
+        if signature is None:
+            return []
+        band_keys = self.band_keys(signature, author)
+
+        with self.lock:
+            matches, compared = [], {post_id}
+            for bucket, key in zip(self.buckets, band_keys):
+                candidates = [other_id for other_id in bucket.get(key, ()) if other_id not in compared]
+                if not candidates:
+                    continue
+                compared.update(candidates)
+                rows = [self.signatures[other_id][0] for other_id in candidates]
+                similarities = (self.matrix[rows] == signature).mean(axis=1)
+                matches = [(other_id, float(similarity)) for other_id, similarity in zip(candidates, similarities)
+                           if similarity >= self.threshold]
+                if matches:
+                    break
+
+            self.remove(post_id)
+            row = self.free_rows.pop()
+            self.matrix[row] = signature
+            self.signatures[post_id] = (row, band_keys)
+            for bucket, key in zip(self.buckets, band_keys):
+                members = bucket.setdefault(key, {})
+                members[post_id] = None
+                if len(members) > self.bucket_size:
+                    del members[next(iter(members))]
+            while len(self.signatures) > self.window:
+                self.remove(next(iter(self.signatures)))
+
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def remove(self, post_id):
+        """Drop a post from the index (caller holds the lock)"""
+        entry = self.signatures.pop(post_id, None)
+        if entry is None:
+            return
+        self.free_rows.append(entry[0])
+        for bucket, key in zip(self.buckets, entry[1]):
+            members = bucket.get(key)
+            if members is not None:
+                members.pop(post_id, None)
+                if not members:
+                    del bucket[key]
+
+
+# ================================
+# REPOST SCREEN
+# ================================
+
+class DuplicateScreen:
+    """Exact-repost cache and near-duplicate index in front of the rule engine"""
+
+    def __init__(self, cache=None, index=None):
+        self.cache = cache or AnalysisCache()
+        self.index = index or NearDuplicateIndex()
+
+    def prepare(self, chunk):
+        """Split (post_key, post) pairs before analysis
+
+        Returns (ready, todo, duplicates): cached (post_key, violations)
+        for exact reposts under the current rules, the (post_key, post)
+        pairs the engine still has to analyze, and Duplicate violations
+        keyed by post_key.
+        """
+        engine = current_engine()
+        ready, todo, duplicates = [], [], {}
+        for post_key, post in chunk:
+            matches = self.index.insert(post['id'], post['content'], post.get('username'))
+            if matches and "duplicate" in engine.enabled:
+                other_id, similarity = matches[0]
+                duplicates[post_key] = [engine.violation(
+                    "duplicate", f"Matches post #{other_id[:8]} ({similarity:.0%} similar)"
+                )]
+
+            violations = self.cache.get((engine.fingerprint, content_hash(post['content'])))
+            if violations is None:
+                todo.append((post_key, post))
+            else:
+                ready.append((post_key, violations))
+        return ready, todo, duplicates
+
+    def remember(self, posts, results, fingerprint):
+        """Cache engine violations for (post_key, violations) results found under the given rules"""
+        for post_key, violations in results:
+            self.cache.put((fingerprint, content_hash(posts[post_key]['content'])), violations)
@@ -0,0 +1,16 @@
+# ================================
+# FORUM BOARDS AND REPORT REASONS
+# ================================
+
+# eBay Boards
+BOARDS = [
+    "Selling", "Buying", "Payments", "Postage & Shipping",
+    "Technical Issues", "Member to Member Support",
+    "Mentors Forum", "General Discussion", "eBay Café"
+]
+
+# Report reasons
+REPORT_REASONS = [
+    "Naming & Shaming", "Disrespectful Language", "Personal Information Shared",
+    "Spam or Advertising", "Off-Topic Content", "Wrong Board", "Other Policy Violation"
+]
@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, deque
+from datetime import datetime
+from itertools import count
+from urllib.parse import parse_qs, urlsplit
+
+from analysis_service import ANALYSIS_LEASE_SECONDS, ANALYSIS_QUEUE_SIZE, ANALYSIS_WORKERS, AnalysisService
+from forum_boards import BOARDS
+from post_store import PostStore, post_key_for
+
+logger = logging.getLogger(__name__)
+
+# ================================
+# CONFIGURATION
+# ================================
+
+INGEST_HOST = os.environ.get('INGEST_HOST', '127.0.0.1')
+INGEST_PORT = int(os.environ.get('INGEST_PORT', 8600))
+# Posts queued or in flight in the analysis service before new posts get a 429
+INGEST_MAX_BACKLOG = int(os.environ.get('INGEST_MAX_BACKLOG', ANALYSIS_QUEUE_SIZE // 2))
+INGEST_MAX_BATCH = int(os.environ.get('INGEST_MAX_BATCH', 1000))
+INGEST_WAIT_TIMEOUT = float(os.environ.get('INGEST_WAIT_TIMEOUT', 30))
+INGEST_MAX_BODY = 16 * 1024 * 1024
+
+# Seconds between sweeps that resubmit posts left pending in the store
+SWEEP_SECONDS = 5
+# Decisions read from the store's decision log per poll
+DECISION_POLL_LIMIT = 5000
+
+STATUS_TEXT = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 429: 'Too Many Requests',
+}
+
+post_ids = count()
+
+
+# ================================
+# POST VALIDATION
+# ================================
+
+def validate_post(raw):
+    """Normalize one submitted post into the forum's post_data schema
+
+    Returns (post, None), or (None, error message) when it is unusable.
+    """
+    if not isinstance(raw, dict):
+        return None, "post must be a JSON object"
+    for field in ('username', 'content'):
+        if not isinstance(raw.get(field), str) or not raw[field].strip():
+            return None, f"'{field}' must be a non-empty string"
+    board = raw.get('board', 'General Discussion')
+    if board not in BOARDS:
+        return None, f"unknown board '{board}'"
+
+    now = datetime.now()
+    post = {
+        "id": str(raw.get('id') or f"{now.strftime('%Y%m%d_%H%M%S_%f')}_{next(post_ids)}"),
+        "username": raw['username'],
+        "board": board,
+        "title": raw.get('title') or "Untitled Post",
+        "content": raw['content'],
+        "timestamp": raw.get('timestamp') or now.strftime("%Y-%m-%d %H:%M:%S"),
+        "status": "pending",
+        "source": raw.get('source', 'ingest_api'),
+        "report_count": 0,
+        "reports": [],
+        "replies": [],
+        "moderation_note": "",
+        "violations": [],
+        "ai_analyzed": False
+    }
+    for field in ('reports', 'replies'):
+        if isinstance(raw.get(field), list):
+            post[field] = raw[field]
+    post['report_count'] = len(post['reports'])
+    return post, None
+
+
+# ================================
+# ASYNC INGESTION SERVER
+# ================================
+
+class IngestServer:
+    """Minimal asyncio HTTP/1.1 front end to the post store and analysis service
+
+    POST /posts        one post object or a list of them; 202 with their ids,
+                       or with ?wait=1, 200 once every decision is ready
+    GET  /stats        counters, backlog and ingest-to-decision latency
+    GET  /health       liveness
+
+    New posts are refused with 429 while the analysis backlog is above
+    max_backlog, so callers slow down instead of queueing without bound.
+    Batches are capped at max_backlog posts, so any accepted batch size
+    fits once the backlog drains.
+
+    Posts are stored already claimed for this server's analysis service;
+    ones it has no room for go back to the store's pending queue, where a
+    dashboard sharing the store may claim them first.
+    Waiters and latency follow the store's decision log, whichever
+    process decided; logging the decisions is left to the dashboard.
+    """
+
+    def __init__(self, store, service, max_backlog=INGEST_MAX_BACKLOG,
+                 max_batch=INGEST_MAX_BATCH, wait_timeout=INGEST_WAIT_TIMEOUT):
+        self.store = store
+        self.service = service
+        self.max_backlog = max_backlog
+        # A batch that could never fit the backlog gets a 413, not a 429 its sender would retry forever
+        self.max_batch = min(max_batch, max_backlog)
+        self.wait_timeout = wait_timeout
+        self.waiters = {}
+        self.received = {}
+        self.latencies = deque(maxlen=10000)
+        self.counts = Counter()
+        # Only decisions made after startup are of interest here
+        self.decision_seq = store.latest_decision()
+
+    def backlog(self):
+        """Posts queued or being analyzed"""
+        progress = self.service.progress()
+        return progress['queued'] + progress['in_flight']
+
+    # ---------- request handling ----------
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > INGEST_MAX_BODY:
+                    await self.respond(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload, extra = await self.route(method, target, body)
+                close = headers.get('connection', '').lower() == 'close' or version.strip() == 'HTTP/1.0'
+                await self.respond(writer, status, payload, extra, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, extra=None, close=False):
+        body = json.dumps(payload).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'close' if close else 'keep-alive'}",
+        ] + [f"{name}: {value}" for name, value in (extra or {}).items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def route(self, method, target, body):
+        """(status, payload, extra headers) for one request"""
+        url = urlsplit(target)
+        if url.path == '/posts':
+            if method != 'POST':
+                return 405, {"error": "use POST"}, None
+            wait = parse_qs(url.query).get('wait', ['0'])[0] not in ('0', 'false', '')
+            return await self.ingest(body, wait)
+        if url.path == '/stats' and method == 'GET':
+            return 200, self.stats(), None
+        if url.path == '/health' and method == 'GET':
+            return 200, {"status": "ok"}, None
+        return 404, {"error": "not found"}, None
+
+    async def ingest(self, body, wait):
+        """Validate, store and enqueue a post or a batch of posts"""
+        try:
+            submitted = json.loads(body or b'null')
+        except json.JSONDecodeError as exc:
+            return 400, {"error": f"invalid JSON: {exc.msg}"}, None
+        batch = submitted if isinstance(submitted, list) else [submitted]
+        if not batch:
+            return 400, {"error": "no posts"}, None
+        if len(batch) > self.max_batch:
+            return 413, {"error": f"at most {self.max_batch} posts per request"}, None
+
+        posts, errors = [], []
+        for index, raw in enumerate(batch):
+            post, error = validate_post(raw)
+            if error:
+                errors.append({"index": index, "error": error})
+            else:
+                posts.append(post)
+        if errors:
+            self.counts['invalid'] += len(errors)
+            return 400, {"error": "invalid posts", "details": errors}, None
+
+        backlog = self.backlog()
+        if backlog + len(posts) > self.max_backlog:
+            self.counts['throttled'] += len(posts)
+            return 429, {"error": "analysis backlog full", "backlog": backlog}, {"Retry-After": "1"}
+
+        loop = asyncio.get_running_loop()
+        keys = [post_key_for(post) for post in posts]
+        futures = []
+        received = time.perf_counter()
+        for post_key in keys:
+            self.received.setdefault(post_key, received)
+            if wait:
+                future = loop.create_future()
+                self.waiters.setdefault(post_key, []).append(future)
+                futures.append(future)
+
+        await asyncio.to_thread(self.store_and_submit, posts)
+        self.counts['accepted'] += len(posts)
+
+        if not wait:
+            return 202, {"accepted": len(posts), "ids": [post['id'] for post in posts]}, None
+
+        done, pending = await asyncio.wait(futures, timeout=self.wait_timeout)
+        decisions = [future.result() for future in futures if future in done]
+        if pending:
+            for post_key, future in zip(keys, futures):
+                if future in pending:
+                    self.waiters.get(post_key, []).remove(future)
+            return 202, {"accepted": len(posts), "decisions": decisions, "pending": len(pending)}, None
+        return 200, {"accepted": len(posts), "decisions": decisions}, None
+
+    def store_and_submit(self, posts):
+        """Write posts to the store, claimed, and hand them to the analysis service (worker thread)"""
+        self.store.upsert_posts(posts, lease_seconds=ANALYSIS_LEASE_SECONDS)
+        accepted = self.service.submit_claimed({post_key_for(post): post for post in posts})
+        if accepted < len(posts):
+            # The rest stay pending in the store and are picked up by the next sweep, here or in a dashboard
+            logger.warning("Analysis queue full: %d of %d posts left pending", len(posts) - accepted, len(posts))
+
+    # ---------- decisions ----------
+
+    async def collect_results(self):
+        """Resolve waiters and record latency as decisions reach the store's decision log"""
+        last_sweep = time.monotonic()
+        while True:
+            decisions = []
+            if self.received:
+                # Nothing to resolve until posts are waiting; the log is caught up on the next poll
+                decisions = await asyncio.to_thread(self.store.decisions_since, self.decision_seq, DECISION_POLL_LIMIT)
+            now = time.perf_counter()
+            for seq, post_key, _, _, result, _ in decisions:
+                self.decision_seq = seq
+                received = self.received.pop(post_key, None)
+                if received is not None:
+                    self.latencies.append(now - received)
+                    self.counts['decided'] += 1
+                for future in self.waiters.pop(post_key, ()):
+                    if not future.done():
+                        future.set_result(result)
+
+            if time.monotonic() - last_sweep > SWEEP_SECONDS and not self.backlog():
+                last_sweep = time.monotonic()
+                await asyncio.to_thread(self.service.submit_pending)
+
+            await asyncio.sleep(0.002 if decisions else 0.01)
+
+    def stats(self):
+        """Ingest counters, current backlog and decision latency percentiles"""
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 2) if latencies else None
+
+        return dict(self.counts, backlog=self.backlog(), max_backlog=self.max_backlog,
+                    latency_ms={"p50": percentile(0.5), "p99": percentile(0.99)}, analysis=self.service.progress())
+
+    async def serve(self, host=INGEST_HOST, port=INGEST_PORT):
+        """Accept connections until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        collector = asyncio.create_task(self.collect_results())
+        logger.info("Ingesting posts on http://%s:%d/posts", host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            collector.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP endpoint that feeds posts into the moderation pipeline")
+    parser.add_argument('--host', default=INGEST_HOST)
+    parser.add_argument('--port', type=int, default=INGEST_PORT)
+    parser.add_argument('--workers', type=int, default=ANALYSIS_WORKERS, help="analysis workers, 0 for inline")
+    parser.add_argument('--max-backlog', type=int, default=INGEST_MAX_BACKLOG,
+                        help="queued posts before new posts are refused with 429")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    store = PostStore()
+    service = AnalysisService(store, workers=args.workers)
+    # Posts left unanalyzed by an earlier run go first
+    service.submit_pending()
+    try:
+        asyncio.run(IngestServer(store, service, max_backlog=args.max_backlog).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from analysis_service import ANALYSIS_CHUNK_SIZE, ANALYSIS_WORKERS, analyze_chunk, init_worker
+from duplicate_detection import DuplicateScreen
+from moderation_engine import build_result
+
+# ================================
+# HEADLESS JSONL MODERATION
+# ================================
+#
+#   python moderate_feed.py posts.jsonl -o decisions.jsonl --workers 8 --stats
+#   tail -f feed.jsonl | python moderate_feed.py --workers 0 --chunk-size 1
+#
+# Reads posts in the Forum App's post_data schema, one JSON object per
+# line, and writes one analysis result per post in input order.
+
+
+def read_posts(lines, errors):
+    """Yield post dicts from JSONL lines, counting unusable lines in errors"""
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            post = json.loads(line)
+        except json.JSONDecodeError as exc:
+            errors['invalid_json'] += 1
+            print(f"line {line_number}: invalid JSON ({exc.msg})", file=sys.stderr)
+            continue
+        if not isinstance(post, dict) or not isinstance(post.get('content'), str) or 'id' not in post:
+            errors['missing_fields'] += 1
+            print(f"line {line_number}: post needs an 'id' and a string 'content'", file=sys.stderr)
+            continue
+        post['id'] = str(post['id'])
+        yield post
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size consecutive items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_stream(posts, workers=ANALYSIS_WORKERS, chunk_size=ANALYSIS_CHUNK_SIZE, screen=None):
+    """Yield (post, result) for every post, in input order
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    however long the input is. A DuplicateScreen, when given, adds
+    Duplicate violations against earlier posts in the stream, and exact
+    reposts reuse its cached violations instead of being analyzed again.
+    """
+    chunks = chunked(((str(i), post) for i, post in enumerate(posts)), chunk_size)
+
+    def screened(chunk):
+        """(cached violations by post_key, pairs still to analyze, Duplicate violations by post_key)"""
+        if screen is None:
+            return {}, chunk, {}
+        ready, todo, duplicates = screen.prepare(chunk)
+        return dict(ready), todo, duplicates
+
+    def finish(chunk, cached, todo, analyzed, duplicates):
+        detected, _, fingerprint = analyzed
+        if screen is not None and detected:
+            screen.remember(dict(todo), detected, fingerprint)
+        found = {**dict(detected), **cached}
+        for post_key, post in chunk:
+            yield post, build_result(post['id'], found[post_key] + duplicates.get(post_key, []))
+
+    if workers <= 0:
+        init_worker()
+        for chunk in chunks:
+            cached, todo, duplicates = screened(chunk)
+            yield from finish(chunk, cached, todo, analyze_chunk(todo), duplicates)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        in_flight = deque()
+
+        def finish_oldest():
+            chunk, cached, todo, future, duplicates = in_flight.popleft()
+            analyzed = future.result() if future else ([], None, None)
+            return finish(chunk, cached, todo, analyzed, duplicates)
+
+        for chunk in chunks:
+            cached, todo, duplicates = screened(chunk)
+            # Chunks made only of exact reposts never reach a worker
+            future = executor.submit(analyze_chunk, todo) if todo else None
+            in_flight.append((chunk, cached, todo, future, duplicates))
+            if len(in_flight) >= workers * 2:
+                yield from finish_oldest()
+        while in_flight:
+            yield from finish_oldest()
+
+
+def summarize(stats, errors, elapsed):
+    """Human-readable run summary"""
+    lines = [
+        f"posts: {stats['posts']:,} in {elapsed:.1f}s ({stats['posts'] / elapsed if elapsed else 0:,.0f} posts/s)",
+        f"flagged: {stats['flagged']:,}  assured: {stats['posts'] - stats['flagged']:,}",
+        "priority: " + ', '.join(f"{p} {stats['priority_' + p]:,}" for p in ('critical', 'high', 'medium', 'low')),
+    ]
+    violation_counts = sorted(((key[10:], count) for key, count in stats.items() if key.startswith('violation_')),
+                              key=lambda item: item[1], reverse=True)
+    lines += [f"  {v_type}: {count:,}" for v_type, count in violation_counts]
+    if errors:
+        lines.append("skipped: " + ', '.join(f"{reason} {count:,}" for reason, count in errors.items()))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Moderate a JSONL feed of forum posts without the dashboard")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL file of posts (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL file for decisions (default: stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=ANALYSIS_WORKERS,
+                        help=f"analysis processes, 0 to analyze in this process (default: {ANALYSIS_WORKERS})")
+    parser.add_argument('-c', '--chunk-size', type=int, default=ANALYSIS_CHUNK_SIZE,
+                        help=f"posts per worker task (default: {ANALYSIS_CHUNK_SIZE})")
+    parser.add_argument('--duplicates', action='store_true', help="flag near-duplicates of earlier posts in the feed")
+    parser.add_argument('--stats', action='store_true', help="print a summary to stderr when done")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    errors, stats = Counter(), Counter()
+    screen = DuplicateScreen() if args.duplicates else None
+    started = time.perf_counter()
+
+    try:
+        for post, result in analyze_stream(read_posts(source, errors), args.workers, max(1, args.chunk_size), screen):
+            sink.write(json.dumps(result) + '\n')
+            if args.chunk_size == 1:
+                sink.flush()
+            stats['posts'] += 1
+            stats['flagged'] += result['overall_status'] == 'flagged'
+            stats['priority_' + result['priority']] += 1
+            for violation in result['violations_detected']:
+                stats['violation_' + violation['type']] += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    if args.stats:
+        print(summarize(stats, errors, time.perf_counter() - started), file=sys.stderr)
+    return 1 if errors and not stats['posts'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from time import perf_counter
+
+from text_classifier import CLASSIFIER_THRESHOLD, CLASSIFIER_WEIGHTS, HashingClassifier, metadata_path
+from text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# ================================
+# RULE DEFINITIONS
+# ================================
+
+# Keyword lists, patterns, severities and policies live in a JSON rules
+# file so policy changes need no code change or restart
+RULES_FILE = os.environ.get(
+    'MODERATION_RULES', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'moderation_rules.json')
+)
+# Seconds between checks of the rules file for changes
+RULES_CHECK_SECONDS = float(os.environ.get('RULES_CHECK_SECONDS', 2))
+
+# Rule family -> what its matcher needs from the rules file, in addition
+# to type, severity, confidence and policy
+RULE_FIELDS = {
+    "pii": ("patterns",),
+    "naming": ("keywords", "pattern"),
+    "profanity": ("patterns",),
+    "insult": ("keywords",),
+    "spam": ("keywords",),
+    # Raised by duplicate_detection, which needs recent posts and not just one post's text
+    "duplicate": (),
+}
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+
+def keyword_alternation(words):
+    """Build one alternation that matches any of the literal keywords"""
+    if not words:
+        # An empty alternation would match everywhere; this never matches
+        return '(?!)'
+    # Longest first so a keyword never shadows a longer one sharing its prefix
+    ordered = sorted(set(words), key=len, reverse=True)
+    return '|'.join(re.escape(word) for word in ordered)
+
+
+def read_rules(path=RULES_FILE):
+    """Parse and validate a rules file; returns (rules, fingerprint of its bytes)"""
+    with open(path, 'rb') as rules_file:
+        raw = rules_file.read()
+    rules = json.loads(raw).get('rules')
+    if not isinstance(rules, dict):
+        raise ValueError(f"{path}: expected a 'rules' object")
+
+    for family, fields in RULE_FIELDS.items():
+        rule = rules.get(family)
+        if not isinstance(rule, dict):
+            raise ValueError(f"{path}: missing rule '{family}'")
+        for field in ('type', 'severity', 'confidence', 'policy') + fields:
+            if field not in rule:
+                raise ValueError(f"{path}: rule '{family}' needs '{field}'")
+        if rule['severity'] not in SEVERITY_RANK:
+            raise ValueError(f"{path}: rule '{family}' has unknown severity '{rule['severity']}'")
+    return rules, hashlib.sha256(raw).hexdigest()[:16]
+
+
+def engine_fingerprint(rules_fingerprint, classifier):
+    """Identifies the rules plus classifier an engine was built from"""
+    return rules_fingerprint if classifier is None else f"{rules_fingerprint}+{classifier.version}"
+
+
+def file_signature(path):
+    """(mtime, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_result(post_id, violations):
+    """Summarize detected violations into the dashboard's result dict"""
+    result = {
+        "post_id": post_id,
+        "overall_status": "assured",
+        "confidence": 95,
+        "priority": "low",
+        "violations_detected": [],
+        "recommended_action": "none"
+    }
+
+    if violations:
+        result["overall_status"] = "flagged"
+        result["violations_detected"] = violations
+        result["confidence"] = max(v["confidence"] for v in violations)
+        result["priority"] = max((v["severity"] for v in violations), key=SEVERITY_RANK.get)
+        result["recommended_action"] = "edit"
+
+    return result
+
+
+# ================================
+# COMPILED RULE ENGINE
+# ================================
+
+class RuleEngine:
+    """All moderation rules compiled once and applied in a single pass per family
+
+    Built from a rules file (RULES_FILE by default) and, when one has been
+    trained, the text classifier. Use a RuleBook to get an engine that
+    follows edits to either.
+    """
+
+    def __init__(self, rules=None, fingerprint=None, classifier=None, threshold=CLASSIFIER_THRESHOLD):
+        if rules is None:
+            rules, fingerprint = read_rules()
+            classifier = HashingClassifier.load()
+        self.rules = rules
+        self.fingerprint = engine_fingerprint(fingerprint, classifier)
+
+        # The classifier only scores posts the rules leave inconclusive: no
+        # violation at all, or only hits from rules marked "verify"
+        self.classifier = classifier
+        self.threshold = threshold
+        self.verify_types = {rule["type"] for rule in rules.values() if rule.get("verify")}
+
+        # Every rule runs on one of the post's shared normalized forms (see
+        # text_normalization): PII on the case-kept text, usernames and
+        # links on lower, keywords and profanity on folded.
+        # Named groups let one search report which PII type matched.
+        # IGNORECASE is safe for all three: Phone is digits only and
+        # Email already accepts both cases.
+        self.pii_regex = re.compile(
+            '|'.join(f'(?P<{pii_type}>{pattern})' for pii_type, pattern in rules["pii"]["patterns"].items()) or '(?!)',
+            re.IGNORECASE
+        )
+        self.negative_regex = re.compile(keyword_alternation(rules["naming"]["keywords"]))
+        self.named_user_regex = re.compile(rules["naming"]["pattern"])
+        self.profanity_regex = re.compile('|'.join(rules["profanity"]["patterns"]) or '(?!)')
+        self.insult_regex = re.compile(keyword_alternation(rules["insult"]["keywords"]))
+        self.spam_regex = re.compile(keyword_alternation(rules["spam"]["keywords"]))
+
+        check_for = {
+            "pii": self.check_pii,
+            "naming": self.check_naming,
+            "profanity": self.check_profanity,
+            "insult": self.check_insult,
+            "spam": self.check_spam,
+        }
+        # Enabled rule families in the rules file's order, each returning a list of violations
+        self.enabled = {family for family, rule in rules.items() if rule.get("enabled", True)}
+        self.checks = [(family, check_for[family]) for family in rules if family in check_for and family in self.enabled]
+
+    def violation(self, family, evidence, subtype=None):
+        """Create a violation dict for a rule family"""
+        rule = self.rules[family]
+        return {
+            "type": rule["type"].format(subtype),
+            "confidence": rule["confidence"],
+            "evidence": evidence,
+            "policy": rule["policy"],
+            "severity": rule["severity"]
+        }
+
+    def scan_pii(self, content):
+        """Every PII occurrence in one pass: [(pii_type, start, end)] of content in text order"""
+        text = normalize_text(content)
+        return [(match.lastgroup, *text.raw_span(*match.span())) for match in self.pii_regex.finditer(text.text)]
+
+    def redact(self, content, spans=None):
+        """content with every PII span replaced by the pii rule's redaction marker
+
+        Takes the spans from scan_pii, or scans content itself.
+        """
+        spans = self.scan_pii(content) if spans is None else spans
+        if not spans:
+            return content
+        template = self.rules["pii"].get("redaction", "[{} removed]")
+        pieces, position = [], 0
+        for pii_type, start, end in spans:
+            pieces.append(content[position:start])
+            pieces.append(template.format(pii_type))
+            position = end
+        pieces.append(content[position:])
+        return ''.join(pieces)
+
+    def check_pii(self, text):
+        """PII Detection: one violation per PII type found, with each distinct match as evidence"""
+        found = {}
+        for match in self.pii_regex.finditer(text.text):
+            matches = found.setdefault(match.lastgroup, [])
+            if match.group() not in matches:
+                matches.append(match.group())
+        return [self.violation("pii", ', '.join(matches), pii_type) for pii_type, matches in found.items()]
+
+    def check_naming(self, text):
+        """Naming & Shaming"""
+        if self.negative_regex.search(text.folded) and self.named_user_regex.search(text.lower):
+            return [self.violation("naming", "Username with negative context")]
+        return []
+
+    def check_profanity(self, text):
+        """Disrespect - Profanity"""
+        if self.profanity_regex.search(text.folded):
+            return [self.violation("profanity", "Profane language")]
+        return []
+
+    def check_insult(self, text):
+        """Disrespect - Insults"""
+        match = self.insult_regex.search(text.folded)
+        if match:
+            return [self.violation("insult", f"Contains: '{match.group()}'")]
+        return []
+
+    def check_spam(self, text):
+        """Spam"""
+        match = self.spam_regex.search(text.lower)
+        if match:
+            return [self.violation("spam", f"Link to: {match.group()}")]
+        return []
+
+    def inconclusive(self, violations):
+        """True when the rules found nothing, or only hits the classifier has to verify"""
+        return all(v["type"] in self.verify_types for v in violations)
+
+    def classify(self, texts, detected, rule_stats=None):
+        """Merge classifier verdicts into the violation lists of inconclusive posts
+
+        texts are the posts' NormalizedText forms. Scores every
+        inconclusive post as one batch, updates detected in place and
+        returns the positions whose violations changed.
+        """
+        if self.classifier is None:
+            return []
+        pending = [i for i, violations in enumerate(detected) if self.inconclusive(violations)]
+        if not pending:
+            return []
+
+        started = perf_counter()
+        scores = self.classifier.scores([texts[i] for i in pending])
+        changed = [i for i, post_scores in zip(pending, scores) if self.merge_scores(detected[i], post_scores)]
+        if rule_stats is not None:
+            rule_stats.merge({"classifier": [len(pending), len(changed), perf_counter() - started]})
+        return changed
+
+    def merge_scores(self, violations, scores):
+        """Apply one post's class scores to its violations; True when they changed
+
+        A confident score adds a violation of that rule family, and a
+        confidently low one drops a "verify" rule's keyword hit.
+        """
+        changed = False
+        for family, score in zip(self.classifier.classes, scores):
+            if family not in self.enabled:
+                continue
+            rule = self.rules[family]
+            if any(v["type"] == rule["type"] for v in violations):
+                if rule.get("verify") and score < 1 - self.threshold:
+                    violations[:] = [v for v in violations if v["type"] != rule["type"]]
+                    changed = True
+            elif score >= self.threshold:
+                violation = self.violation(family, f"Classifier score {score:.2f}")
+                violation["confidence"] = int(round(score * 100))
+                violations.append(violation)
+                changed = True
+        return changed
+
+    def detect(self, content, rule_stats=None):
+        """Return the violations found in content, in rule order
+
+        Pass a perf_metrics.RuleStats to count hits and time per rule;
+        without one, no timing work is done at all.
+        """
+        text = normalize_text(content)
+        violations = self.match_rules(text, rule_stats)
+        if self.classifier is not None:
+            self.classify([text], [violations], rule_stats)
+        return violations
+
+    def detect_many(self, contents, rule_stats=None):
+        """detect() for many posts, with one classifier batch for all inconclusive ones"""
+        texts = [normalize_text(content) for content in contents]
+        detected = [self.match_rules(text, rule_stats) for text in texts]
+        self.classify(texts, detected, rule_stats)
+        return detected
+
+    def match_rules(self, text, rule_stats=None):
+        """Violations from the compiled rules alone for a NormalizedText, in rule order"""
+        violations = []
+
+        if rule_stats is None:
+            for _, check in self.checks:
+                found = check(text)
+                if found:
+                    violations.extend(found)
+            return violations
+
+        for family, check in self.checks:
+            started = perf_counter()
+            found = check(text)
+            rule_stats.record(family, perf_counter() - started, bool(found))
+            if found:
+                violations.extend(found)
+        return violations
+
+    def analyze(self, content, post_id, rule_stats=None):
+        """Build the full analysis result for a single post"""
+        return build_result(post_id, self.detect(content, rule_stats))
+
+
+# ================================
+# HOT-RELOADED RULES
+# ================================
+
+class RuleBook:
+    """The compiled RuleEngine for a rules file, rebuilt when the file changes
+
+    engine() looks at the rules file and the classifier's metadata file at
+    most every check_seconds. A new mtime or size makes it re-read them,
+    and only a different rules hash or classifier version is compiled into
+    a new engine. A file that fails to parse or compile is logged and the
+    previous engine stays in use.
+    """
+
+    def __init__(self, path=RULES_FILE, check_seconds=RULES_CHECK_SECONDS, classifier_path=CLASSIFIER_WEIGHTS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.classifier_path = classifier_path
+        self.lock = threading.Lock()
+        self.current = None
+        self.file_state = None
+        self.checked_at = float('-inf')
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker must not inherit the lock mid-reload
+            os.register_at_fork(after_in_child=self.reset_lock)
+
+    def reset_lock(self):
+        self.lock = threading.Lock()
+
+    def engine(self):
+        """The engine for the file's current contents"""
+        current = self.current
+        if current is not None and time.monotonic() - self.checked_at < self.check_seconds:
+            return current
+        with self.lock:
+            if self.current is None or time.monotonic() - self.checked_at >= self.check_seconds:
+                self.reload()
+            return self.current
+
+    def reload(self):
+        """Recompile if the file changed since the last check (lock held)"""
+        self.checked_at = time.monotonic()
+        try:
+            file_state = (file_signature(self.path), file_signature(metadata_path(self.classifier_path)))
+            if file_state == self.file_state:
+                return
+            # Remembered before parsing so a broken file is reported once, not every check
+            self.file_state = file_state
+            rules, fingerprint = read_rules(self.path)
+            classifier = HashingClassifier.load(self.classifier_path)
+            if self.current is not None and engine_fingerprint(fingerprint, classifier) == self.current.fingerprint:
+                return
+            engine = RuleEngine(rules, fingerprint, classifier)
+        except Exception:
+            if self.current is None:
+                raise
+            logger.exception("Keeping rules %s: %s could not be loaded", self.current.fingerprint, self.path)
+            return
+
+        if self.current is not None:
+            logger.info("Reloaded rules from %s (%s -> %s)", self.path, self.current.fingerprint, engine.fingerprint)
+        self.current = engine
+
+
+rule_book = RuleBook()
+
+
+def current_engine():
+    """The process's engine for RULES_FILE, recompiled after the file changes"""
+    return rule_book.engine()
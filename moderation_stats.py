@@ -0,0 +1,686 @@
+import io
+import json
+import os
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# ================================
+# STATS METRICS
+# ================================
+
+ACTION_TYPES = [
+    'analyzed', 'edited', 'removed', 'approved', 'no_action_required', 'overridden',
+    'moved', 'locked', 'merged', 'banned', 'warned'
+]
+
+# Stats key -> substring of violation_type that puts a violation in that family
+VIOLATION_FAMILIES = {
+    'pii_violations': 'PII',
+    'naming_violations': 'Naming',
+    'disrespect_violations': 'Disrespect',
+    'wrong_board_violations': 'Wrong Board',
+    'off_topic_violations': 'Off-Topic',
+    'spam_violations': 'Spam',
+    'fee_avoidance_violations': 'Fee',
+    'duplicate_violations': 'Duplicate',
+    'moderation_discussion_violations': 'Moderation',
+    'policy_breach_violations': 'Policy Breach',
+    'necropost_violations': 'Necropost',
+    'advertising_violations': 'Advertising',
+    'other_violations': 'Other',
+}
+
+SEVERITIES = ['critical', 'high', 'medium', 'low']
+
+STATS_KEYS = ['total_actions', 'total_violations'] + ACTION_TYPES + list(VIOLATION_FAMILIES) + SEVERITIES
+
+# Flush buffered log events after this many, even within one rerun
+EVENT_BATCH_SIZE = int(os.environ.get('EVENT_BATCH_SIZE', 1000))
+# Most recently analyzed post_keys remembered so re-analysis is not counted
+# as a new post; a post analyzed again after falling out counts twice
+COUNTED_POSTS_SIZE = int(os.environ.get('COUNTED_POSTS_SIZE', 200000))
+
+
+@lru_cache(maxsize=None)
+def violation_families(violation_type):
+    """Stats keys of every family a violation type belongs to"""
+    return tuple(key for key, marker in VIOLATION_FAMILIES.items() if marker in violation_type)
+
+
+def to_epoch(value):
+    """Coerce an epoch int, date or datetime to integer epoch seconds"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, date):
+        return int(datetime(value.year, value.month, value.day).timestamp())
+    return int(value)
+
+
+def as_date(value):
+    """Coerce a 'YYYY-MM-DD' string, date or datetime to a date"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+# ================================
+# PER-DAY COUNTERS
+# ================================
+
+class DailyCounters:
+    """Pre-aggregated stats counters bucketed by day
+
+    Each logged event bumps a handful of counters for its date, so a
+    period query only has to sum one bucket per day in the range.
+    """
+
+    def __init__(self):
+        self.days = {}
+
+    def add(self, date, metric, amount=1):
+        """Increment one (date, metric) counter"""
+        bucket = self.days.get(date)
+        if bucket is None:
+            bucket = self.days[date] = Counter()
+        bucket[metric] += amount
+
+    def record_action(self, date, action_type):
+        """Count a moderation action"""
+        self.add(date, 'total_actions')
+        self.add(date, action_type)
+
+    def record_violation(self, date, violation_type, severity):
+        """Count a violation under its families and severity"""
+        self.add(date, 'total_violations')
+        for key in violation_families(violation_type):
+            self.add(date, key)
+        self.add(date, severity)
+
+    def add_counts(self, date, counts):
+        """Add a whole Counter of metrics for one date"""
+        bucket = self.days.get(date)
+        if bucket is None:
+            bucket = self.days[date] = Counter()
+        bucket.update(counts)
+
+    def period_totals(self, start_date, end_date):
+        """Sum every metric over the inclusive date range"""
+        start_date, end_date = as_date(start_date), as_date(end_date)
+        totals = Counter()
+        span = (end_date - start_date).days + 1
+
+        if span > len(self.days):
+            # Fewer stored days than days in range: walk the buckets instead
+            start_str, end_str = start_date.isoformat(), end_date.isoformat()
+            for date, bucket in self.days.items():
+                if start_str <= date <= end_str:
+                    totals.update(bucket)
+        else:
+            for offset in range(span):
+                bucket = self.days.get((start_date + timedelta(days=offset)).isoformat())
+                if bucket:
+                    totals.update(bucket)
+
+        return {key: totals.get(key, 0) for key in STATS_KEYS}
+
+
+# ================================
+# TIME-INDEXED COLUMNAR EVENT LOG
+# ================================
+
+# Column layouts of the two logs. Low-cardinality fields are dictionary
+# encoded (pandas categoricals on export); JSON fields hold small dicts.
+ACTION_SCHEMA = pa.schema([
+    ('timestamp', pa.string()),
+    ('date', pa.string()),
+    ('post_id', pa.string()),
+    ('username', pa.dictionary(pa.int32(), pa.string())),
+    ('action_type', pa.dictionary(pa.int32(), pa.string())),
+    ('moderator', pa.dictionary(pa.int32(), pa.string())),
+    ('details', pa.string()),
+])
+
+VIOLATION_SCHEMA = pa.schema([
+    ('timestamp', pa.string()),
+    ('date', pa.string()),
+    ('post_id', pa.string()),
+    ('username', pa.dictionary(pa.int32(), pa.string())),
+    ('violation_type', pa.dictionary(pa.int32(), pa.string())),
+    ('severity', pa.dictionary(pa.int32(), pa.string())),
+    ('confidence', pa.int16()),
+    ('evidence', pa.string()),
+])
+
+JSON_FIELDS = ('details',)
+
+
+class EventLog:
+    """Append-only event log kept in time order as Arrow record batches
+
+    New entries collect in a small row buffer that is sealed into an
+    immutable, dictionary-encoded record batch every CHUNK_ROWS entries.
+    Alongside it the log keeps an integer epoch column for bisect range
+    queries and posting lists of positions for the fields moderators
+    filter on, so neither kind of query copies or rescans the log.
+    """
+
+    INDEXED_FIELDS = ('username', 'post_id', 'action_type', 'violation_type')
+    CHUNK_ROWS = 4096
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.batches = []
+        self.pending = []
+        self.epochs = array('q')
+        self.indexes = {field: {} for field in self.INDEXED_FIELDS if field in schema.names}
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        chunk, row = divmod(position, self.CHUNK_ROWS)
+        if chunk == len(self.batches):
+            return self.pending[row]
+        batch = self.batches[chunk]
+        return self.decode({name: batch.column(i)[row].as_py() for i, name in enumerate(batch.schema.names)})
+
+    def __iter__(self):
+        for batch in self.batches:
+            for entry in batch.to_pylist():
+                yield self.decode(entry)
+        yield from self.pending
+
+    def decode(self, entry):
+        """Turn a stored row back into the entry dict that was appended"""
+        for field in JSON_FIELDS:
+            if field in entry:
+                entry[field] = json.loads(entry[field]) if entry[field] is not None else {}
+        return entry
+
+    def append(self, entry, epoch):
+        """Add an entry stamped with epoch seconds and return its position"""
+        # Never let a clock step backwards break the sorted epoch column
+        if self.epochs and epoch < self.epochs[-1]:
+            epoch = self.epochs[-1]
+
+        position = len(self.epochs)
+        self.pending.append(entry)
+        self.epochs.append(epoch)
+        for field, index in self.indexes.items():
+            if field in entry:
+                index.setdefault(entry[field], []).append(position)
+
+        if len(self.pending) == self.CHUNK_ROWS:
+            self.batches.append(self.to_batch(self.pending))
+            self.pending = []
+        return position
+
+    def extend(self, entries, epochs):
+        """Append many entries with their epochs and return the first position"""
+        first = len(self.epochs)
+        last = self.epochs[-1] if self.epochs else None
+        for entry, epoch in zip(entries, epochs):
+            if last is not None and epoch < last:
+                epoch = last
+            self.epochs.append(epoch)
+            last = epoch
+
+        for field, index in self.indexes.items():
+            for position, entry in enumerate(entries, first):
+                if field in entry:
+                    index.setdefault(entry[field], []).append(position)
+
+        self.pending.extend(entries)
+        while len(self.pending) >= self.CHUNK_ROWS:
+            self.batches.append(self.to_batch(self.pending[:self.CHUNK_ROWS]))
+            del self.pending[:self.CHUNK_ROWS]
+        return first
+
+    def to_batch(self, entries):
+        """Encode entry dicts as one record batch of this log's schema"""
+        columns = []
+        for field in self.schema:
+            values = [entry.get(field.name) for entry in entries]
+            if field.name in JSON_FIELDS:
+                values = [json.dumps(value) if value is not None else None for value in values]
+            if pa.types.is_dictionary(field.type):
+                columns.append(pa.array(values, field.type.value_type).dictionary_encode())
+            else:
+                columns.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def bounds(self, start=None, end=None):
+        """Positions [first, stop) of the entries with start <= time < end"""
+        first = 0 if start is None else bisect_left(self.epochs, to_epoch(start))
+        stop = len(self.epochs) if end is None else bisect_left(self.epochs, to_epoch(end))
+        return first, max(first, stop)
+
+    def iter_batches(self, start=None, end=None):
+        """Record batches covering start <= time < end, sliced without copying"""
+        first, stop = self.bounds(start, end)
+        chunk_rows = self.CHUNK_ROWS
+        for chunk in range(first // chunk_rows, min(len(self.batches), -(-stop // chunk_rows))):
+            offset = chunk * chunk_rows
+            lo, hi = max(first, offset) - offset, min(stop, offset + chunk_rows) - offset
+            yield self.batches[chunk].slice(lo, hi - lo)
+
+        offset = len(self.batches) * chunk_rows
+        if stop > offset and self.pending:
+            lo = max(first, offset) - offset
+            yield self.to_batch(self.pending[lo:stop - offset])
+
+    def table(self, start=None, end=None):
+        """Arrow table of the entries with start <= time < end"""
+        return pa.Table.from_batches(list(self.iter_batches(start, end)), schema=self.schema)
+
+    def frame(self, start=None, end=None):
+        """pandas DataFrame of the period, dictionary columns as categoricals"""
+        return self.table(start, end).to_pandas()
+
+    def export_parquet(self, sink, start=None, end=None, batches=None):
+        """Stream the period, or batches already taken from iter_batches, to a Parquet file path or binary file object"""
+        with pq.ParquetWriter(sink, self.schema) as writer:
+            for batch in self.iter_batches(start, end) if batches is None else batches:
+                writer.write_batch(batch)
+
+    def export_csv(self, sink, start=None, end=None, batches=None):
+        """Stream the period, or batches already taken from iter_batches, to a CSV file path or binary file object"""
+        schema = pa.schema([pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+                            for field in self.schema])
+        with pa_csv.CSVWriter(sink, schema) as writer:
+            for batch in self.iter_batches(start, end) if batches is None else batches:
+                writer.write_batch(batch.cast(schema))
+
+    def range(self, start=None, end=None):
+        """View of the entries with start <= time < end"""
+        return self.view().range(start, end)
+
+    def where(self, **criteria):
+        """View of the entries whose fields equal every criterion"""
+        return self.view().where(**criteria)
+
+    def view(self):
+        """View over the whole log"""
+        count = len(self.epochs)
+        return LogView(self, range(count), 0, count, 0, count, {})
+
+
+class LogView:
+    """Lazy, non-copying selection of EventLog entries
+
+    positions[lo:hi] are the candidate log positions (ascending) inside the
+    log position window [first, stop). positions is either the whole log
+    or the posting list of one criterion; every criterion is re-checked
+    per entry, so only the driving one costs nothing.
+    """
+
+    def __init__(self, log, positions, lo, hi, first, stop, criteria, driver=None):
+        self.log = log
+        self.positions = positions
+        self.lo = lo
+        self.hi = hi
+        self.first = first
+        self.stop = stop
+        self.criteria = criteria
+        self.driver = driver
+
+    def __iter__(self):
+        for i in range(self.lo, self.hi):
+            entry = self.log[self.positions[i]]
+            if self.matches(entry):
+                yield entry
+
+    def __reversed__(self):
+        for i in range(self.hi - 1, self.lo - 1, -1):
+            entry = self.log[self.positions[i]]
+            if self.matches(entry):
+                yield entry
+
+    def __len__(self):
+        if not self.criteria or list(self.criteria) == [self.driver]:
+            return self.hi - self.lo
+        return sum(1 for _ in self)
+
+    def matches(self, entry):
+        """True when entry satisfies every criterion"""
+        return all(entry.get(field) == value for field, value in self.criteria.items())
+
+    def latest(self, count):
+        """The newest count entries, newest first"""
+        result = []
+        for entry in reversed(self):
+            if len(result) == count:
+                break
+            result.append(entry)
+        return result
+
+    def bounded(self, positions, first, stop, criteria, driver):
+        """View of a sorted positions sequence clipped to [first, stop)"""
+        lo = bisect_left(positions, first)
+        hi = bisect_left(positions, stop, lo)
+        return LogView(self.log, positions, lo, hi, first, stop, criteria, driver)
+
+    def range(self, start=None, end=None):
+        """Restrict the view to start <= time < end"""
+        epochs = self.log.epochs
+        first = self.first if start is None else max(self.first, bisect_left(epochs, to_epoch(start)))
+        stop = self.stop if end is None else min(self.stop, bisect_left(epochs, to_epoch(end)))
+        return self.bounded(self.positions, first, max(first, stop), self.criteria, self.driver)
+
+    def where(self, **criteria):
+        """Restrict the view to entries whose fields equal every criterion"""
+        combined = dict(self.criteria)
+        for field, value in criteria.items():
+            if combined.get(field, value) != value:
+                return self.bounded((), self.first, self.first, combined, None)
+            combined[field] = value
+
+        indexes = self.log.indexes
+        indexed = [field for field in combined if field in indexes]
+        if not indexed:
+            return LogView(self.log, self.positions, self.lo, self.hi, self.first, self.stop, combined, self.driver)
+
+        # Drive iteration from the shortest posting list
+        driver = min(indexed, key=lambda field: len(indexes[field].get(combined[field], ())))
+        positions = indexes[driver].get(combined[driver], [])
+        return self.bounded(positions, self.first, self.stop, combined, driver)
+
+
+# ================================
+# USER PROFILES
+# ================================
+
+class UserProfile:
+    """Compact per-user record: counters, status and recent event positions
+
+    Full event dicts stay in the EventLogs; the profile only remembers the
+    log positions of the last few, so its size never grows with activity.
+    """
+
+    __slots__ = (
+        'username', 'first_seen', 'total_posts', 'total_violations', 'violation_types',
+        'severity_counts', 'status', 'recent_violations', 'recent_actions'
+    )
+
+    RECENT_VIOLATIONS = 10
+    RECENT_ACTIONS = 5
+
+    def __init__(self, username, first_seen):
+        self.username = username
+        self.first_seen = first_seen
+        self.total_posts = 0
+        self.total_violations = 0
+        self.violation_types = {}
+        self.severity_counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
+        self.status = 'clean'
+        self.recent_violations = deque(maxlen=self.RECENT_VIOLATIONS)
+        self.recent_actions = deque(maxlen=self.RECENT_ACTIONS)
+
+    def record_post(self):
+        """Count a post by this user"""
+        self.total_posts += 1
+
+    def record_violation(self, entry, position):
+        """Count a violation and remember its violation_log position"""
+        self.total_violations += 1
+        self.recent_violations.append(position)
+
+        v_type = entry['violation_type']
+        self.violation_types[v_type] = self.violation_types.get(v_type, 0) + 1
+
+        severity = entry['severity']
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+
+        if self.severity_counts['critical'] > 0 or self.total_violations >= 5:
+            self.status = 'flagged'
+        elif self.total_violations >= 2:
+            self.status = 'warning'
+
+    def record_action(self, entry, position):
+        """Remember an action_log position and apply bans"""
+        self.recent_actions.append(position)
+        if entry['action_type'] == 'banned':
+            self.status = 'banned'
+
+
+# ================================
+# MODERATION STATS STATE
+# ================================
+
+class ModerationStats:
+    """Action and violation logs, per-day counters and user profiles
+
+    Holds everything the dashboard's stats views read, independent of
+    Streamlit, so the same logging paths run in benchmarks and scripts.
+    """
+
+    def __init__(self, counted_posts_size=COUNTED_POSTS_SIZE):
+        self.action_log = EventLog(ACTION_SCHEMA)
+        self.violation_log = EventLog(VIOLATION_SCHEMA)
+        self.user_profiles = {}
+        self.daily_counters = DailyCounters()
+        # post_keys already counted in their author's total_posts, least
+        # recently analyzed first, capped at counted_posts_size
+        self.counted_posts = OrderedDict()
+        self.counted_posts_size = counted_posts_size
+
+    def log_moderation_action(self, post_id, action_type, moderator, username, details=None, now=None):
+        """Log every moderation action"""
+        now = now or datetime.now()
+        log_entry = {
+            'timestamp': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'date': now.strftime('%Y-%m-%d'),
+            'post_id': post_id,
+            'username': username,
+            'action_type': action_type,
+            'moderator': moderator,
+            'details': details or {}
+        }
+        position = self.action_log.append(log_entry, int(now.timestamp()))
+        self.daily_counters.record_action(log_entry['date'], action_type)
+        self.update_user_profile(username, 'action', log_entry, position)
+        return log_entry
+
+    def log_violation(self, post_id, username, violation_type, severity, confidence, evidence, now=None):
+        """Log each violation detected"""
+        now = now or datetime.now()
+        violation_entry = {
+            'timestamp': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'date': now.strftime('%Y-%m-%d'),
+            'post_id': post_id,
+            'username': username,
+            'violation_type': violation_type,
+            'severity': severity,
+            'confidence': confidence,
+            'evidence': evidence
+        }
+        position = self.violation_log.append(violation_entry, int(now.timestamp()))
+        self.daily_counters.record_violation(violation_entry['date'], violation_type, severity)
+        self.update_user_profile(username, 'violation', violation_entry, position)
+        return violation_entry
+
+    def log_analysis(self, post_id, username, result, now=None):
+        """Log the violations and the 'analyzed' action for one analysis result"""
+        violations = result["violations_detected"]
+
+        for v in violations:
+            self.log_violation(post_id, username, v["type"], v["severity"], v["confidence"], v["evidence"], now)
+
+        self.log_moderation_action(post_id, "analyzed", "AI System", username, {
+            'status': result['overall_status'],
+            'violations_found': len(violations)
+        }, now)
+
+    def record_events(self, events):
+        """Log a batch of buffered EventSink events in one pass
+
+        Entries are built first and then appended to each log, the per-day
+        counters and the user profiles together, instead of one scattered
+        update per event.
+        """
+        violations, violation_epochs, actions, action_epochs = [], [], [], []
+        posted = []
+        day_counts = {}
+        # Events in one batch mostly share a second, so format each second once
+        stamps = {}
+
+        for event in events:
+            if event[0] == 'post':
+                # Re-analysis after a redaction or rules reload is not a new post
+                _, post_key, username, _ = event
+                if post_key in self.counted_posts:
+                    self.counted_posts.move_to_end(post_key)
+                else:
+                    self.counted_posts[post_key] = None
+                    posted.append(username)
+                    if len(self.counted_posts) > self.counted_posts_size:
+                        self.counted_posts.popitem(last=False)
+                continue
+            epoch = int(event[-1].timestamp())
+            stamp = stamps.get(epoch)
+            if stamp is None:
+                now = event[-1]
+                stamp = stamps[epoch] = (now.strftime('%Y-%m-%d %H:%M:%S'), now.strftime('%Y-%m-%d'))
+            timestamp, day = stamp
+            counts = day_counts.get(day)
+            if counts is None:
+                counts = day_counts[day] = Counter()
+
+            if event[0] == 'analysis':
+                _, post_id, username, result, _ = event
+                for v in result["violations_detected"]:
+                    violations.append({
+                        'timestamp': timestamp, 'date': day, 'post_id': post_id, 'username': username,
+                        'violation_type': v["type"], 'severity': v["severity"],
+                        'confidence': v["confidence"], 'evidence': v["evidence"]
+                    })
+                    violation_epochs.append(epoch)
+                    counts['total_violations'] += 1
+                    counts.update(violation_families(v["type"]))
+                    counts[v["severity"]] += 1
+                action_type, moderator = "analyzed", "AI System"
+                details = {'status': result['overall_status'], 'violations_found': len(result["violations_detected"])}
+            else:
+                _, post_id, action_type, moderator, username, details, _ = event
+
+            actions.append({
+                'timestamp': timestamp, 'date': day, 'post_id': post_id, 'username': username,
+                'action_type': action_type, 'moderator': moderator, 'details': details or {}
+            })
+            action_epochs.append(epoch)
+            counts['total_actions'] += 1
+            counts[action_type] += 1
+
+        first_violation = self.violation_log.extend(violations, violation_epochs)
+        first_action = self.action_log.extend(actions, action_epochs)
+        for day, counts in day_counts.items():
+            self.daily_counters.add_counts(day, counts)
+        for username in posted:
+            self.update_user_profile(username, 'post', {})
+        for position, entry in enumerate(violations, first_violation):
+            self.update_user_profile(entry['username'], 'violation', entry, position)
+        for position, entry in enumerate(actions, first_action):
+            self.update_user_profile(entry['username'], 'action', entry, position)
+
+    def update_user_profile(self, username, event_type, event_data, position=None):
+        """Update user profile with new events"""
+        profile = self.user_profiles.get(username)
+        if profile is None:
+            profile = self.user_profiles[username] = UserProfile(
+                username, datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
+
+        if event_type == 'post':
+            profile.record_post()
+        elif event_type == 'violation':
+            profile.record_violation(event_data, position)
+        elif event_type == 'action':
+            profile.record_action(event_data, position)
+
+    def get_user_profile(self, username):
+        """Get complete user profile"""
+        return self.user_profiles.get(username)
+
+    def get_stats_for_period(self, start_date, end_date):
+        """Get comprehensive stats for date range"""
+        return self.daily_counters.period_totals(start_date, end_date)
+
+    def period_batches(self, log_name, start_date, end_date):
+        """(log, record batches) of one log's entries for the inclusive date range
+
+        Sealed batches are sliced without copying, so taking them is cheap
+        enough to do under a lock and leave the encoding for after.
+        """
+        log = self.action_log if log_name == 'actions' else self.violation_log
+        start, end = as_date(start_date), as_date(end_date) + timedelta(days=1)
+        return log, list(log.iter_batches(start, end))
+
+    def export_period(self, log_name, start_date, end_date, file_format='parquet'):
+        """One log's entries for the inclusive date range as Parquet or CSV bytes"""
+        return export_batches(*self.period_batches(log_name, start_date, end_date), file_format)
+
+
+def export_batches(log, batches, file_format='parquet'):
+    """Record batches from one of log's periods as Parquet or CSV bytes"""
+    sink = io.BytesIO()
+    if file_format == 'csv':
+        log.export_csv(sink, batches=batches)
+    else:
+        log.export_parquet(sink, batches=batches)
+    return sink.getvalue()
+
+
+# ================================
+# BUFFERED EVENT SINK
+# ================================
+
+class EventSink:
+    """Collects analysis results and moderator actions for batched logging
+
+    Nothing reaches the logs, counters or profiles until flush(), which
+    hands every buffered event to ModerationStats.record_events at once.
+    Readers flush first; a full buffer flushes itself.
+    """
+
+    def __init__(self, stats, batch_size=EVENT_BATCH_SIZE):
+        self.stats = stats
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def analysis(self, post_id, username, result, now=None):
+        """Buffer one analysis result: its violations plus an 'analyzed' action"""
+        self.add(('analysis', post_id, username, result, now or datetime.now()))
+
+    def post(self, post_key, username, now=None):
+        """Buffer an analyzed post for its author's post count; repeats of a post_key are not counted"""
+        self.add(('post', post_key, username, now or datetime.now()))
+
+    def action(self, post_id, action_type, moderator, username, details=None, now=None):
+        """Buffer one moderation action"""
+        self.add(('action', post_id, action_type, moderator, username, details, now or datetime.now()))
+
+    def add(self, event):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered event and return how many there were"""
+        events, self.buffer = self.buffer, []
+        if events:
+            self.stats.record_events(events)
+        return len(events)
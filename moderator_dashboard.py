@@ -1,7 +1,17 @@
+import time
+
 import streamlit as st
 import pandas as pd
-import re
 from datetime import datetime, timedelta
+from functools import partial
+
+from analysis_service import AnalysisService
+from moderation_engine import current_engine
+from moderation_stats import EventSink, as_date
+from perf_metrics import PERF_METRICS_FILE, PERF_METRICS_PORT, PerfMetrics, deep_sizeof
+from post_store import PostStore, post_key_for
+from queue_index import QUEUE_COLUMNS
+from shared_state import SharedModeration
 
 # ================================
 # PAGE CONFIG
@@ -95,324 +105,209 @@ st.markdown("""
 # STATS STORAGE
 # ================================
 
+@st.cache_resource
+def get_shared_moderation():
+    """Stats, user profiles and post claims shared by every moderator session"""
+    return SharedModeration()
+
+shared_moderation = get_shared_moderation()
+
 def init_stats_storage():
     """Initialize comprehensive stats storage"""
-    if 'action_log' not in st.session_state:
-        st.session_state.action_log = []
+    # Log events are buffered per session and written to the shared stats in batches
+    if 'event_sink' not in st.session_state:
+        st.session_state.event_sink = EventSink(shared_moderation)
     
-    if 'violation_log' not in st.session_state:
-        st.session_state.violation_log = []
-    
-    if 'user_profiles' not in st.session_state:
-        st.session_state.user_profiles = {}
+    if 'moderator_name' not in st.session_state:
+        st.session_state.moderator_name = shared_moderation.next_moderator_name()
 
 def log_moderation_action(post_id, action_type, moderator, username, details=None):
     """Log every moderation action"""
-    log_entry = {
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'date': datetime.now().strftime('%Y-%m-%d'),
-        'post_id': post_id,
-        'username': username,
-        'action_type': action_type,
-        'moderator': moderator,
-        'details': details or {}
-    }
-    st.session_state.action_log.append(log_entry)
-    update_user_profile(username, 'action', log_entry)
-    return log_entry
-
-def log_violation(post_id, username, violation_type, severity, confidence, evidence):
-    """Log each violation detected"""
-    violation_entry = {
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'date': datetime.now().strftime('%Y-%m-%d'),
-        'post_id': post_id,
-        'username': username,
-        'violation_type': violation_type,
-        'severity': severity,
-        'confidence': confidence,
-        'evidence': evidence
-    }
-    st.session_state.violation_log.append(violation_entry)
-    update_user_profile(username, 'violation', violation_entry)
-    return violation_entry
-
-def update_user_profile(username, event_type, event_data):
+    st.session_state.event_sink.action(post_id, action_type, moderator, username, details)
+
+def update_user_profile(username, event_type, event_data, position=None):
     """Update user profile with new events"""
-    if username not in st.session_state.user_profiles:
-        st.session_state.user_profiles[username] = {
-            'username': username,
-            'first_seen': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'total_posts': 0,
-            'total_violations': 0,
-            'violations': [],
-            'actions': [],
-            'violation_types': {},
-            'severity_counts': {'critical': 0, 'high': 0, 'medium': 0, 'low': 0},
-            'status': 'clean'
-        }
-    
-    profile = st.session_state.user_profiles[username]
-    
-    if event_type == 'post':
-        profile['total_posts'] += 1
-    
-    elif event_type == 'violation':
-        profile['total_violations'] += 1
-        profile['violations'].append(event_data)
-        
-        v_type = event_data['violation_type']
-        profile['violation_types'][v_type] = profile['violation_types'].get(v_type, 0) + 1
-        
-        severity = event_data['severity']
-        profile['severity_counts'][severity] = profile['severity_counts'].get(severity, 0) + 1
-        
-        if profile['severity_counts']['critical'] > 0 or profile['total_violations'] >= 5:
-            profile['status'] = 'flagged'
-        elif profile['total_violations'] >= 2:
-            profile['status'] = 'warning'
-    
-    elif event_type == 'action':
-        profile['actions'].append(event_data)
-        if event_data['action_type'] == 'banned':
-            profile['status'] = 'banned'
+    shared_moderation.update_user_profile(username, event_type, event_data, position)
 
 def get_user_profile(username):
-    """Get complete user profile"""
-    return st.session_state.user_profiles.get(username, None)
+    """Get complete user profile with its recent violations and actions"""
+    st.session_state.event_sink.flush()
+    return shared_moderation.get_user_profile(username)
 
 def get_stats_for_period(start_date, end_date):
     """Get comprehensive stats for date range"""
-    
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d')
-    
-    start_str = start_date.strftime('%Y-%m-%d')
-    end_str = end_date.strftime('%Y-%m-%d')
-    
-    actions_in_period = [
-        a for a in st.session_state.action_log 
-        if start_str <= a['date'] <= end_str
-    ]
-    
-    violations_in_period = [
-        v for v in st.session_state.violation_log
-        if start_str <= v['date'] <= end_str
-    ]
-    
-    stats = {
-        'total_actions': len(actions_in_period),
-        'total_violations': len(violations_in_period),
-        
-        # Action breakdown
-        'analyzed': len([a for a in actions_in_period if a['action_type'] == 'analyzed']),
-        'edited': len([a for a in actions_in_period if a['action_type'] == 'edited']),
-        'removed': len([a for a in actions_in_period if a['action_type'] == 'removed']),
-        'approved': len([a for a in actions_in_period if a['action_type'] == 'approved']),
-        'no_action_required': len([a for a in actions_in_period if a['action_type'] == 'no_action_required']),
-        'overridden': len([a for a in actions_in_period if a['action_type'] == 'overridden']),
-        'moved': len([a for a in actions_in_period if a['action_type'] == 'moved']),
-        'locked': len([a for a in actions_in_period if a['action_type'] == 'locked']),
-        'merged': len([a for a in actions_in_period if a['action_type'] == 'merged']),
-        'banned': len([a for a in actions_in_period if a['action_type'] == 'banned']),
-        'warned': len([a for a in actions_in_period if a['action_type'] == 'warned']),
-        
-        # Violation breakdown
-        'pii_violations': len([v for v in violations_in_period if 'PII' in v['violation_type']]),
-        'naming_violations': len([v for v in violations_in_period if 'Naming' in v['violation_type']]),
-        'disrespect_violations': len([v for v in violations_in_period if 'Disrespect' in v['violation_type']]),
-        'wrong_board_violations': len([v for v in violations_in_period if 'Wrong Board' in v['violation_type']]),
-        'off_topic_violations': len([v for v in violations_in_period if 'Off-Topic' in v['violation_type']]),
-        'spam_violations': len([v for v in violations_in_period if 'Spam' in v['violation_type']]),
-        'fee_avoidance_violations': len([v for v in violations_in_period if 'Fee' in v['violation_type']]),
-        'duplicate_violations': len([v for v in violations_in_period if 'Duplicate' in v['violation_type']]),
-        'moderation_discussion_violations': len([v for v in violations_in_period if 'Moderation' in v['violation_type']]),
-        'policy_breach_violations': len([v for v in violations_in_period if 'Policy Breach' in v['violation_type']]),
-        'necropost_violations': len([v for v in violations_in_period if 'Necropost' in v['violation_type']]),
-        'advertising_violations': len([v for v in violations_in_period if 'Advertising' in v['violation_type']]),
-        'other_violations': len([v for v in violations_in_period if 'Other' in v['violation_type']]),
-        
-        # Severity breakdown
-        'critical': len([v for v in violations_in_period if v['severity'] == 'critical']),
-        'high': len([v for v in violations_in_period if v['severity'] == 'high']),
-        'medium': len([v for v in violations_in_period if v['severity'] == 'medium']),
-        'low': len([v for v in violations_in_period if v['severity'] == 'low']),
-    }
-    
-    return stats
+    st.session_state.event_sink.flush()
+    return shared_moderation.get_stats_for_period(start_date, end_date)
+
+def act_on_post(post_key, post, action_type, details=None):
+    """Log this moderator's action unless another moderator holds or already handled the post"""
+    moderator = st.session_state.moderator_name
+    if not shared_moderation.complete(post_key, moderator, action_type):
+        return False
+    log_moderation_action(post['id'], action_type, moderator, post['username'], details)
+    # Other moderators' sidebars should count it without waiting for this session's next rerun
+    st.session_state.event_sink.flush()
+    return True
+
+# ================================
+# PERFORMANCE METRICS
+# ================================
+
+@st.cache_resource
+def get_perf_metrics():
+    """Process-wide timings, exported on PERF_METRICS_PORT when set"""
+    metrics = PerfMetrics()
+    if PERF_METRICS_PORT:
+        metrics.serve(PERF_METRICS_PORT)
+    return metrics
+
+perf_metrics = get_perf_metrics()
 
 # ================================
 # ULTRA-STRICT AI ANALYSIS
 # ================================
 
+def log_analysis(post_id, username, result, now=None):
+    """Buffer the violations and the 'analyzed' action for one analysis result, made at now"""
+    st.session_state.event_sink.analysis(post_id, username, result, now)
+
 def analyze_post_ultra_strict(content, post_id, board, username):
-    """Ultra-strict policy analysis"""
-    
-    result = {
-        "post_id": post_id,
-        "overall_status": "assured",
-        "confidence": 95,
-        "priority": "low",
-        "violations_detected": [],
-        "recommended_action": "none"
-    }
-    
-    violations = []
-    highest_priority = "low"
-    max_confidence = 0
-    
-    # PII Detection
-    pii_patterns = {
-        "Phone": r'\b(0[1-9]\d{8,9}|\+44\s?\d{10}|0[2-4]\d{8}|\+61\s?\d{9})\b',
-        "Email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-        "Address": r'\b[A-Z]{1,2}\d[A-Z\d]?\s?\d[A-Z]{2}\b'
-    }
-    
-    for pii_type, pattern in pii_patterns.items():
-        match = re.search(pattern, content, re.IGNORECASE if pii_type == "Address" else 0)
-        if match:
-            violations.append({
-                "type": f"PII - {pii_type}",
-                "confidence": 100,
-                "evidence": match.group(),
-                "policy": "Contact Information Sharing Policy",
-                "severity": "critical"
-            })
-            highest_priority = "critical"
-            max_confidence = 100
-            log_violation(post_id, username, f"PII - {pii_type}", "critical", 100, match.group())
-            break
-    
-    # Naming & Shaming
-    negative_words = ['scam', 'scammer', 'fraud', 'terrible', 'awful', 'worst', 'avoid', 'cheat']
-    content_lower = content.lower()
-    
-    if any(word in content_lower for word in negative_words):
-        if re.search(r'\b(?:seller|buyer)\s+[A-Za-z0-9_-]{3,20}\b', content, re.IGNORECASE):
-            violations.append({
-                "type": "Naming and Shaming",
-                "confidence": 94,
-                "evidence": "Username with negative context",
-                "policy": "Board Usage Policy",
-                "severity": "high"
-            })
-            if highest_priority in ["low", "medium"]:
-                highest_priority = "high"
-            max_confidence = max(max_confidence, 94)
-            log_violation(post_id, username, "Naming and Shaming", "high", 94, "Username with negative context")
-    
-    # Disrespect - Profanity
-    profanity = [r'\bf[\*\@]ck', r'\bsh[\*\!]t', r'\bd[\@\*]mn', r'\bb[\*\!]tch']
-    for pattern in profanity:
-        if re.search(pattern, content_lower):
-            violations.append({
-                "type": "Disrespect - Profanity",
-                "confidence": 98,
-                "evidence": "Profane language",
-                "policy": "Board Usage Policy",
-                "severity": "medium"
-            })
-            if highest_priority == "low":
-                highest_priority = "medium"
-            max_confidence = max(max_confidence, 98)
-            log_violation(post_id, username, "Disrespect - Profanity", "medium", 98, "Profane language")
-            break
-    
-    # Disrespect - Insults
-    insults = ['idiot', 'stupid', 'dumb', 'moron', 'fool']
-    for insult in insults:
-        if insult in content_lower:
-            violations.append({
-                "type": "Disrespect - Insult",
-                "confidence": 96,
-                "evidence": f"Contains: '{insult}'",
-                "policy": "Board Usage Policy",
-                "severity": "high"
-            })
-            if highest_priority in ["low", "medium"]:
-                highest_priority = "high"
-            max_confidence = max(max_confidence, 96)
-            log_violation(post_id, username, "Disrespect - Insult", "high", 96, f"Contains: '{insult}'")
-            break
-    
-    # Spam
-    spam_domains = ['amazon.com', 'amazon.co.uk', 'etsy.com']
-    for domain in spam_domains:
-        if domain in content_lower:
-            violations.append({
-                "type": "Spam - External Link",
-                "confidence": 100,
-                "evidence": f"Link to: {domain}",
-                "policy": "Board Usage Policy",
-                "severity": "high"
-            })
-            highest_priority = "high"
-            max_confidence = 100
-            log_violation(post_id, username, "Spam - External Link", "high", 100, f"Link to: {domain}")
-            break
-    
-    if violations:
-        result["overall_status"] = "flagged"
-        result["violations_detected"] = violations
-        result["confidence"] = max_confidence
-        result["priority"] = highest_priority
-        result["recommended_action"] = "edit"
-    
-    log_moderation_action(post_id, "analyzed", "AI System", username, {
-        'status': result['overall_status'],
-        'violations_found': len(violations)
-    })
-    
+    """Ultra-strict policy analysis
+    
+    Side-effect free: nothing is logged, so it is safe for re-runs and
+    what-if checks. Pass the result to log_analysis to record it.
+    """
+    rule_stats = perf_metrics.rule_stats()
+    result = current_engine().analyze(content, post_id, rule_stats)
+    if rule_stats:
+        perf_metrics.merge_rules(rule_stats.counts)
     return result
 
+# ================================
+# SHARED POST STORE
+# ================================
+
+@st.cache_resource
+def get_post_store():
+    """Open the post store shared with the Forum App"""
+    return PostStore()
+
+post_store = get_post_store()
+
+# Seconds between live queue updates while "🔄 Auto" is on
+LIVE_REFRESH_SECONDS = 3
+# Seconds between claims of posts left pending by a failed chunk or a full queue
+PENDING_SWEEP_SECONDS = 5
+
+@st.cache_resource
+def get_analysis_service():
+    """Start the background analysis workers once per process"""
+    return AnalysisService(get_post_store(), metrics=get_perf_metrics())
+
+analysis_service = get_analysis_service()
+
+# ================================
+# PII REDACTION
+# ================================
+
+# Moderator note shown on forum posts whose contact details were removed
+REDACTION_NOTE = "Contact details removed by a moderator"
+
+def redact_posts(posts):
+    """Remove PII from {post_key: post} that no other moderator holds; returns the edited post keys
+    
+    Edited posts are written in one transaction and go back to the
+    analysis queue, so they are re-classified and can be claimed again.
+    """
+    engine = current_engine()
+    moderator = st.session_state.moderator_name
+    edits = {}
+    for post_key, post in posts.items():
+        spans = engine.scan_pii(post['content'])
+        if spans and shared_moderation.complete(post_key, moderator, "edited"):
+            edits[post_key] = engine.redact(post['content'], spans)
+            log_moderation_action(post['id'], "edited", moderator, post['username'], {'redacted': len(spans)})
+    
+    post_store.edit_contents(edits, REDACTION_NOTE)
+    shared_moderation.claims.reopen(edits)
+    st.session_state.event_sink.flush()
+    return list(edits)
+
 # ================================
 # SESSION STATE INITIALIZATION
 # ================================
 
 init_stats_storage()
 
-if 'forum_posts' not in st.session_state:
-    st.session_state.forum_posts = {}
-
-if 'ebay_forum_posts_v1' not in st.session_state:
-    st.session_state['ebay_forum_posts_v1'] = {}
+# Page-start cursors per queue column; the last one is the page on screen
+if 'queue_cursors' not in st.session_state:
+    st.session_state.queue_cursors = {column: [None] for column in QUEUE_COLUMNS}
 
 if 'viewing_user_profile' not in st.session_state:
     st.session_state.viewing_user_profile = None
 
-# Sync with forum app and AUTO-ANALYZE new posts
-if 'ebay_forum_posts_v1' in st.session_state and st.session_state['ebay_forum_posts_v1']:
-    st.session_state.forum_posts = st.session_state['ebay_forum_posts_v1']
-    
-    # AUTO-ANALYZE: Check for any unanalyzed posts and analyze them automatically
-    for post_key, post in st.session_state.forum_posts.items():
-        if not post.get('ai_analyzed', False):
-            # Automatically analyze this post
-            analysis = analyze_post_ultra_strict(
-                post['content'], 
-                post['id'], 
-                post.get('board', 'Unknown'), 
-                post['username']
-            )
-            
-            # Update post with analysis results
-            st.session_state.forum_posts[post_key]['ai_analyzed'] = True
-            st.session_state.forum_posts[post_key]['overall_status'] = analysis['overall_status']
-            st.session_state.forum_posts[post_key]['confidence'] = analysis['confidence']
-            st.session_state.forum_posts[post_key]['priority'] = analysis['priority']
-            st.session_state.forum_posts[post_key]['violations_detected'] = analysis['violations_detected']
-            
-            # Also update in ebay_forum_posts_v1
-            if post_key in st.session_state['ebay_forum_posts_v1']:
-                st.session_state['ebay_forum_posts_v1'][post_key]['ai_analyzed'] = True
-                st.session_state['ebay_forum_posts_v1'][post_key]['overall_status'] = analysis['overall_status']
-                st.session_state['ebay_forum_posts_v1'][post_key]['confidence'] = analysis['confidence']
-                st.session_state['ebay_forum_posts_v1'][post_key]['priority'] = analysis['priority']
-                st.session_state['ebay_forum_posts_v1'][post_key]['violations_detected'] = analysis['violations_detected']
-            
-            update_user_profile(post['username'], 'post', {})
+# Post claimed with "Next post to review", and whether the button was used yet
+if 'next_review' not in st.session_state:
+    st.session_state.next_review = None
+    st.session_state.next_review_requested = False
+
+# Store version and analysis counts as of the last sync, for the live poller
+if 'live_seen' not in st.session_state:
+    st.session_state.live_seen = None
+
+# When this session last claimed pending posts without a store change prompting it
+if 'pending_swept_at' not in st.session_state:
+    st.session_state.pending_swept_at = float('-inf')
+
+def live_state():
+    """Store version and finished analysis counts; the queue only changes when these do"""
+    progress = analysis_service.progress()
+    return post_store.latest_version(), progress['done'], progress['failed']
+
+def sweep_due():
+    """True at most every PENDING_SWEEP_SECONDS
+
+    Released claims do not bump the store version, so without a sweep
+    posts from failed chunks or beyond the queue bound would wait for an
+    unrelated store write.
+    """
+    now = time.monotonic()
+    if now - st.session_state.pending_swept_at < PENDING_SWEEP_SECONDS:
+        return False
+    st.session_state.pending_swept_at = now
+    return True
+
+def sync_posts():
+    """Pull changed posts, hand pending ones to the analysis service and log new decisions
+    
+    Changed posts are filed in the process-wide queue columns, so this is
+    only a version lookup when no session has seen a change since.
+    Decisions are logged from the store's decision log rather than from
+    this process's analysis service, so posts analyzed by the ingest
+    server are logged too, each exactly once.
+    """
+    seen, st.session_state.live_seen = st.session_state.live_seen, live_state()
+    with perf_metrics.phase('sync'):
+        changed = shared_moderation.pull_posts(post_store)
+    
+    with perf_metrics.phase('analyze'):
+        # AUTO-ANALYZE: Claim the store's pending posts for the analysis service,
+        # retrying at once when chunks failed since the last sync
+        retry = seen is not None and seen[2] != st.session_state.live_seen[2]
+        if changed or retry or sweep_due():
+            analysis_service.submit_pending()
+        
+        decisions = shared_moderation.take_decisions(post_store)
+        for post_key, post_id, username, result, decided_at in decisions:
+            # Dated when the decision was made, so replayed history lands on its own day
+            log_analysis(post_id, username, result, decided_at)
+            st.session_state.event_sink.post(post_key, username, decided_at)
+        st.session_state.event_sink.flush()
+        if decisions:
+            # Show the posts behind these decisions on this rerun, not the next
+            shared_moderation.pull_posts(post_store)
+
+sync_posts()
 
 # ================================
 # USER PROFILE VIEW
@@ -420,42 +315,43 @@ if 'ebay_forum_posts_v1' in st.session_state and st.session_state['ebay_forum_po
 
 def show_user_profile(username):
     """Display detailed user profile"""
-    profile = get_user_profile(username)
+    user_profile = get_user_profile(username)
     
-    if not profile:
+    if not user_profile:
         st.warning(f"No profile found for user: {username}")
         return
+    profile, recent_violations, recent_actions = user_profile
     
     st.markdown(f"""
     <div class="user-profile-card">
         <h2>👤 User Profile: {username}</h2>
-        <p><strong>Member Since:</strong> {profile['first_seen']}</p>
-        <p><strong>Status:</strong> {profile['status'].upper()}</p>
+        <p><strong>Member Since:</strong> {profile.first_seen}</p>
+        <p><strong>Status:</strong> {profile.status.upper()}</p>
     </div>
     """, unsafe_allow_html=True)
     
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Posts", profile['total_posts'])
-    col2.metric("Total Violations", profile['total_violations'])
-    col3.metric("🚨 Critical", profile['severity_counts']['critical'])
-    col4.metric("🔴 High", profile['severity_counts']['high'])
+    col1.metric("Total Posts", profile.total_posts)
+    col2.metric("Total Violations", profile.total_violations)
+    col3.metric("🚨 Critical", profile.severity_counts['critical'])
+    col4.metric("🔴 High", profile.severity_counts['high'])
     
     st.markdown("---")
     
     # Violation History
     st.subheader("⚠️ Violation History")
     
-    if profile['violations']:
-        st.warning(f"This user has {len(profile['violations'])} violation(s) on record")
+    if profile.total_violations:
+        st.warning(f"This user has {profile.total_violations} violation(s) on record")
         
         st.markdown("### By Type:")
-        for v_type, count in profile['violation_types'].items():
+        for v_type, count in profile.violation_types.items():
             st.markdown(f"**{v_type}:** {count} occurrence(s)")
         
         st.markdown("---")
         
         st.markdown("### Detailed Violations:")
-        for i, v in enumerate(reversed(profile['violations'][-10:]), 1):
+        for i, v in enumerate(recent_violations, 1):
             severity_emoji = {"critical": "🚨", "high": "🔴", "medium": "🟠", "low": "⚪"}
             emoji = severity_emoji.get(v['severity'], "⚪")
             
@@ -472,8 +368,8 @@ def show_user_profile(username):
     # Action History
     st.subheader("🔧 Moderation Actions Taken")
     
-    if profile['actions']:
-        for action in reversed(profile['actions'][-5:]):
+    if recent_actions:
+        for action in recent_actions:
             st.markdown(f"**{action['timestamp']}** - {action['action_type'].upper()} by {action['moderator']}")
     else:
         st.info("No moderation actions taken yet")
@@ -491,40 +387,73 @@ def show_user_profile(username):
 st.title("🛡️ eBay Community AI Moderation Dashboard")
 st.markdown("**Ultra-Strict Policy Engine | Real-Time Auto-Classification | Complete Stats Tracking**")
 
-# Sync status with auto-analyze indicator
-if st.session_state.forum_posts:
-    analyzed_count = len([p for p in st.session_state.forum_posts.values() if p.get('ai_analyzed')])
-    total_count = len(st.session_state.forum_posts)
-    st.success(f"✨ LIVE MODERATION: {total_count} posts loaded | {analyzed_count} analyzed | Auto-classification active")
-else:
-    st.warning("📡 No posts in queue | Waiting for new posts from Forum App")
-    st.info("👉 **To test:** Open the Forum App in another tab and submit a post. Then click 'Refresh' here to see it analyzed automatically.")
-
-st.markdown("---")
-
 # Control buttons
 col_ref1, col_ref2, col_ref3 = st.columns([4, 1, 1])
 
 with col_ref2:
-    auto_refresh = st.checkbox("🔄 Auto", value=False, help="Auto-refresh every 3 seconds")
+    auto_refresh = st.checkbox("🔄 Auto", value=False, help=f"Live-update the queue every {LIVE_REFRESH_SECONDS} seconds")
 
 with col_ref3:
     if st.button("🔄 Refresh", use_container_width=True):
-        if 'ebay_forum_posts_v1' in st.session_state:
-            st.session_state.forum_posts = st.session_state['ebay_forum_posts_v1']
         st.rerun()
 
-# Auto-refresh functionality
-if auto_refresh:
-    import time
-    time.sleep(3)
-    st.rerun()
+# ================================
+# PERFORMANCE PANEL
+# ================================
+
+def toggle_perf_metrics():
+    """Switch timing collection on or off for the whole process"""
+    perf_metrics.enabled = st.session_state.perf_enabled
+
+def show_performance_panel():
+    """Sidebar breakdown of rerun phases, rule timings and session size"""
+    with st.expander("⏱️ Performance"):
+        st.toggle("Collect timings", value=perf_metrics.enabled, key="perf_enabled", on_change=toggle_perf_metrics,
+                  help="Times rerun phases and every rule for all sessions of this server; off costs nothing")
+        if not perf_metrics.enabled:
+            st.caption("Timing is off.")
+            return
+        
+        perf_metrics.set_gauge('session_state_bytes', deep_sizeof({key: st.session_state[key] for key in st.session_state}))
+        for name, value in analysis_service.progress().items():
+            perf_metrics.set_gauge(f'analysis_{name}', value)
+        rules, phases, gauges = perf_metrics.snapshot()
+        
+        st.markdown("**Last rerun by phase**")
+        st.dataframe([
+            {"Phase": name, "Last ms": round(last * 1000, 2), "Avg ms": round(total / runs * 1000, 2), "Runs": runs}
+            for name, (runs, total, last) in phases.items()
+        ], hide_index=True, use_container_width=True)
+        
+        st.markdown("**Rules**")
+        st.dataframe([
+            {"Rule": rule, "Calls": calls, "Hits": hits, "Total ms": round(seconds * 1000, 2),
+             "µs/call": round(seconds / calls * 1e6, 2) if calls else 0}
+            for rule, (calls, hits, seconds) in rules.items()
+        ], hide_index=True, use_container_width=True)
+        
+        st.metric("Session state", f"{gauges['session_state_bytes'] / 1024:,.0f} KB")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("⬇️ Metrics", perf_metrics.prometheus_text(), file_name="moderation_metrics.prom",
+                               mime="text/plain", use_container_width=True)
+        with col2:
+            if st.button("♻️ Reset", use_container_width=True):
+                perf_metrics.reset()
+                st.rerun()
 
 # ================================
 # SIDEBAR STATS
 # ================================
 
 with st.sidebar:
+    st.text_input("👮 Moderator", key="moderator_name", help="Name recorded on your actions and shown on posts you claim")
+    claimed = shared_moderation.claims.claimed_by(st.session_state.moderator_name)
+    if claimed:
+        st.caption(f"🔒 {len(claimed)} post(s) claimed by you")
+    
+    st.markdown("---")
     st.header("📊 Stats Query")
     
     quick_filter = st.selectbox(
@@ -548,7 +477,8 @@ with st.sidebar:
         start_date = st.date_input("Start", value=datetime.now() - timedelta(days=7))
         end_date = st.date_input("End", value=datetime.now())
     
-    period_stats = get_stats_for_period(start_date, end_date)
+    with perf_metrics.phase('stats'):
+        period_stats = get_stats_for_period(start_date, end_date)
     
     st.markdown("---")
     st.subheader("📈 Period Summary")
@@ -575,6 +505,7 @@ with st.sidebar:
     st.markdown(f"👤 **Naming:** {period_stats['naming_violations']}")
     st.markdown(f"😠 **Disrespect:** {period_stats['disrespect_violations']}")
     st.markdown(f"📧 **Spam:** {period_stats['spam_violations']}")
+    st.markdown(f"🔁 **Duplicate:** {period_stats['duplicate_violations']}")
     st.markdown(f"❓ **Other:** {period_stats['other_violations']}")
     
     st.markdown("---")
@@ -584,30 +515,197 @@ with st.sidebar:
     st.markdown(f"🔴 **High:** {period_stats['high']}")
     st.markdown(f"🟠 **Medium:** {period_stats['medium']}")
     st.markdown(f"⚪ **Low:** {period_stats['low']}")
+    
+    st.markdown("---")
+    st.subheader("📥 Export Period")
+    
+    export_format = st.radio("Format", ["parquet", "csv"], horizontal=True, key="export_format")
+    period_name = f"{as_date(start_date)}_{as_date(end_date)}"
+    for log_name in ("actions", "violations"):
+        st.download_button(
+            f"⬇️ {log_name.capitalize()}",
+            data=partial(shared_moderation.export_period, log_name, start_date, end_date, export_format),
+            file_name=f"moderation_{log_name}_{period_name}.{export_format}",
+            mime="text/csv" if export_format == "csv" else "application/octet-stream",
+            on_click="ignore",
+            use_container_width=True
+        )
+    
+    st.markdown("---")
+    show_performance_panel()
 
 # ================================
 # MAIN VIEW
 # ================================
 
-if st.session_state.viewing_user_profile:
-    show_user_profile(st.session_state.viewing_user_profile)
+QUEUE_PAGE_SIZE = 10
 
-else:
-    # Stats Display
-    all_posts = list(st.session_state.forum_posts.values())
-    ai_approved = [p for p in all_posts if p.get('ai_analyzed') and p.get('overall_status') == 'assured']
-    user_reported = [p for p in all_posts if len(p.get('reports', [])) > 0]
-    ai_flagged = [p for p in all_posts if p.get('ai_analyzed') and p.get('overall_status') == 'flagged']
+def queue_page(column):
+    """Posts on the current page of a queue column, read from the store in one query"""
+    cursor = st.session_state.queue_cursors[column][-1]
+    post_keys, _ = shared_moderation.queue_index.page(column, cursor, QUEUE_PAGE_SIZE)
+    posts = post_store.get_posts(post_keys)
+    return [posts[post_key] for post_key in post_keys if post_key in posts]
+
+def queue_pager(column):
+    """Previous/next page buttons for a queue column"""
+    cursors = st.session_state.queue_cursors[column]
+    _, next_cursor = shared_moderation.queue_index.page(column, cursors[-1], QUEUE_PAGE_SIZE)
+    if len(cursors) == 1 and next_cursor is None:
+        return
+    
+    col_prev, col_page, col_next = st.columns([1, 1, 1])
+    with col_prev:
+        if st.button("◀", key=f"prev_{column}", disabled=len(cursors) == 1, help="Previous page"):
+            cursors.pop()
+            st.rerun(scope="fragment")
+    with col_page:
+        st.caption(f"Page {len(cursors)}")
+    with col_next:
+        if st.button("▶", key=f"next_{column}", disabled=next_cursor is None, help="Next page"):
+            cursors.append(next_cursor)
+            st.rerun(scope="fragment")
+
+def render_flagged_card(post):
+    """Priority, details and detected violations of a post under review"""
+    priority = post.get('priority', 'low')
+    css_class = f"flagged-{priority}"
+    emoji = {"critical":"🚨", "high":"🔴", "medium":"🟠"}.get(priority, "⚪")
+    
+    st.markdown(f"""
+    <div class="{css_class}">
+        {emoji} <strong>{priority.upper()} PRIORITY</strong><br>
+        #{post['id'][:8]} | {post.get('board', 'Unknown')}<br>
+        👤 {post['username']}<br>
+        🕒 {post['timestamp']}<br>
+        📋 <strong>{post.get('title', 'Untitled')}</strong><br><br>
+        <strong>Violations Detected:</strong><br>
+    """, unsafe_allow_html=True)
+    
+    for v in post.get('violations_detected', []):
+        st.markdown(f"• {v['type']} ({v['confidence']}%)<br>", unsafe_allow_html=True)
+    
+    st.markdown("</div>", unsafe_allow_html=True)
+
+def render_review_actions(post_key, post, holder, resolution, key_prefix=""):
+    """Claim status of a post and the buttons this moderator may use on it"""
+    moderator = st.session_state.moderator_name
+    
+    # One moderator at a time: claim the post before acting on it
+    if resolution:
+        st.caption(f"✔️ {resolution[1].capitalize()} by {resolution[0]}")
+    elif holder not in (None, moderator):
+        st.caption(f"🔒 {holder} is reviewing this post")
+    
+    col_a, col_b, col_c = st.columns(3)
+    if holder == moderator:
+        flagged = post.get('overall_status') == 'flagged'
+        with col_a:
+            if st.button("✅", key=f"{key_prefix}accept_{post['id']}", help="Approve (Override AI)" if flagged else "Approve"):
+                if act_on_post(post_key, post, "overridden" if flagged else "approved"):
+                    st.success("Override" if flagged else "Approved")
+                else:
+                    st.warning("Another moderator has this post")
+        with col_b:
+            if st.button("✏️", key=f"{key_prefix}edit_{post['id']}", help="Edit Post: redact contact details"):
+                if not current_engine().scan_pii(post['content']):
+                    st.info("No contact details to redact")
+                elif redact_posts({post_key: post}):
+                    st.info("Edited: contact details removed")
+                else:
+                    st.warning("Another moderator has this post")
+    elif holder is None and not resolution:
+        with col_a:
+            st.button("🔒", key=f"{key_prefix}claim_{post['id']}", help="Claim this post for review",
+                      on_click=shared_moderation.claims.claim, args=(post_key, moderator))
+    with col_c:
+        if st.button("👤", key=f"{key_prefix}profile_f_{post['id']}", help="View User Profile"):
+            st.session_state.viewing_user_profile = post['username']
+            st.rerun()
+
+def claim_next_review():
+    """Claim the top of the shared review queue for this moderator"""
+    st.session_state.next_review = shared_moderation.claim_next(st.session_state.moderator_name)
+    st.session_state.next_review_requested = True
+
+def render_next_review():
+    """The "Next post to review" button and the post it claimed"""
+    review_queue = shared_moderation.review_queue
+    col_button, col_status = st.columns([1, 3])
+    with col_button:
+        st.button("🎯 Next post to review", key="next_review_btn", on_click=claim_next_review, use_container_width=True,
+                  help="Claim the most urgent post nobody else is reviewing: severity, reports, waiting time "
+                       "and the author's violation record")
+    with col_status:
+        st.caption(f"🎯 {len(review_queue)} post(s) awaiting review, most urgent first")
+    
+    post_key = st.session_state.next_review
+    post = post_store.get_post(post_key) if post_key else None
+    if post is None:
+        if st.session_state.next_review_requested:
+            st.success("✅ Nothing left to review")
+        return
+    
+    holder, resolution = shared_moderation.claims.status([post_key])[post_key]
+    render_flagged_card(post)
+    score = review_queue.score(post_key)
+    st.caption(f"🚩 {len(post.get('reports', []))} report(s)" + (f" • review score {score:.0f}" if score is not None else ""))
+    render_review_actions(post_key, post, holder, resolution, key_prefix="next_")
+
+# Auto-refresh only wakes this poller: a version lookup and a counter read,
+# with a rerun only when the store or the analysis service has something new
+@st.fragment(run_every=LIVE_REFRESH_SECONDS if auto_refresh else None)
+def live_poller():
+    """Rerun the dashboard once the store or the analysis results change after the last sync"""
+    if sweep_due():
+        analysis_service.submit_pending()
+    if live_state() != st.session_state.live_seen:
+        st.rerun(scope="app")
+
+# A fragment, so the queue pagers rerun only the queue
+@st.fragment
+def live_queue():
+    """Live moderation queue: sync status, queue totals and the three columns"""
+    sync_posts()
+    with perf_metrics.phase('render'):
+        render_queue()
+
+def render_queue():
+    """Render the queue from the shared column indexes and the store"""
+    queue_index = shared_moderation.queue_index
+    total_count = len(queue_index)
+    
+    # Sync status with auto-analyze indicator
+    if total_count:
+        analyzed_count = queue_index.count('approved') + queue_index.count('flagged')
+        st.success(f"✨ LIVE MODERATION: {total_count} posts loaded | {analyzed_count} analyzed | Auto-classification active")
+        progress = analysis_service.progress()
+        st.caption(
+            f"⚙️ Analysis workers: {progress['queued']} queued • {progress['in_flight']} in flight • "
+            f"{progress['done']} done • {progress['cache_hits']} reposts from cache • "
+            f"rules {current_engine().fingerprint}"
+            + (f" • {progress['failed']} failed" if progress['failed'] else "")
+        )
+    else:
+        st.warning("📡 No posts in queue | Waiting for new posts from Forum App")
+        st.info("👉 **To test:** Open the Forum App in another tab and submit a post. Then click 'Refresh' here to see it analyzed automatically.")
+    
+    st.markdown("---")
+    
+    # Stats Display (totals come from the maintained column indexes)
+    approved_count = queue_index.count('approved')
+    reported_count = queue_index.count('reported')
+    flagged_count = queue_index.count('flagged')
     
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Posts", len(all_posts))
-    col2.metric("✅ AI Approved", len(ai_approved), delta=f"{len(ai_approved)}", delta_color="normal")
-    col3.metric("👤 User Reported", len(user_reported), delta=f"{len(user_reported)}" if len(user_reported) > 0 else "0", delta_color="off")
-    col4.metric("🚨 AI Flagged", len(ai_flagged), delta=f"{len(ai_flagged)}" if len(ai_flagged) > 0 else "0", delta_color="inverse")
+    col1.metric("Total Posts", total_count)
+    col2.metric("✅ AI Approved", approved_count, delta=f"{approved_count}", delta_color="normal")
+    col3.metric("👤 User Reported", reported_count, delta=f"{reported_count}" if reported_count > 0 else "0", delta_color="off")
+    col4.metric("🚨 AI Flagged", flagged_count, delta=f"{flagged_count}" if flagged_count > 0 else "0", delta_color="inverse")
     
     # Show classification status
-    if all_posts:
-        analyzed_pct = (len([p for p in all_posts if p.get('ai_analyzed')]) / len(all_posts)) * 100
+    if total_count:
+        analyzed_pct = ((approved_count + flagged_count) / total_count) * 100
         st.progress(analyzed_pct / 100)
         st.caption(f"📊 Classification Status: {analyzed_pct:.0f}% analyzed and auto-sorted")
     
@@ -616,6 +714,8 @@ else:
     # Add info banner
     st.info("🤖 **AUTO-CLASSIFICATION ACTIVE:** Posts are automatically analyzed and sorted into columns below")
     
+    render_next_review()
+    
     st.markdown("---")
     
     # Three Column Layout
@@ -623,10 +723,10 @@ else:
     
     with col_approved:
         st.subheader("✅ AI Approved")
-        st.caption(f"{len(ai_approved)} posts • Auto-classified as clean")
+        st.caption(f"{approved_count} posts • Auto-classified as clean")
         
-        if ai_approved:
-            for post in ai_approved[:10]:
+        if approved_count:
+            for post in queue_page('approved'):
                 st.markdown(f"""
                 <div class="approved-section">
                     <strong>#{post['id'][:8]}</strong> | {post.get('board', 'Unknown')}<br>
@@ -643,13 +743,14 @@ else:
                     st.rerun()
         else:
             st.success("✅ No approved posts in queue")
+        queue_pager('approved')
     
     with col_reported:
         st.subheader("👤 User Reported")
-        st.caption(f"{len(user_reported)} posts • Requires review")
+        st.caption(f"{reported_count} posts • Requires review")
         
-        if user_reported:
-            for post in sorted(user_reported, key=lambda x: len(x.get('reports', [])), reverse=True)[:10]:
+        if reported_count:
+            for post in queue_page('reported'):
                 report_count = len(post['reports'])
                 css_class = "user-reported-high" if report_count >= 3 else "user-reported-medium" if report_count >= 2 else "user-reported-low"
                 
@@ -667,58 +768,53 @@ else:
                 col_a, col_b = st.columns(2)
                 with col_a:
                     if st.button(f"✅ Approve", key=f"approve_r_{post['id']}", use_container_width=True):
-                        log_moderation_action(post['id'], "approved", "Moderator", post['username'])
-                        st.success("Approved")
+                        if act_on_post(post_key_for(post), post, "approved"):
+                            st.success("Approved")
+                        else:
+                            st.warning("Another moderator has this post")
                 with col_b:
                     if st.button(f"👤 Profile", key=f"profile_r_{post['id']}", use_container_width=True):
                         st.session_state.viewing_user_profile = post['username']
                         st.rerun()
         else:
             st.success("✅ No user reports in queue")
+        queue_pager('reported')
     
     with col_flagged:
         st.subheader("🚨 AI Flagged")
-        st.caption(f"{len(ai_flagged)} posts • Auto-detected violations")
+        st.caption(f"{flagged_count} posts • Auto-detected violations")
         
-        if ai_flagged:
-            for post in sorted(ai_flagged, key=lambda x: {'critical':0,'high':1,'medium':2}.get(x.get('priority','low'),3))[:10]:
-                priority = post.get('priority', 'low')
-                css_class = f"flagged-{priority}"
-                emoji = {"critical":"🚨", "high":"🔴", "medium":"🟠"}.get(priority, "⚪")
-                
-                st.markdown(f"""
-                <div class="{css_class}">
-                    {emoji} <strong>{priority.upper()} PRIORITY</strong><br>
-                    #{post['id'][:8]} | {post.get('board', 'Unknown')}<br>
-                    👤 {post['username']}<br>
-                    🕒 {post['timestamp']}<br>
-                    📋 <strong>{post.get('title', 'Untitled')}</strong><br><br>
-                    <strong>Violations Detected:</strong><br>
-                """, unsafe_allow_html=True)
-                
-                for v in post.get('violations_detected', []):
-                    st.markdown(f"• {v['type']} ({v['confidence']}%)<br>", unsafe_allow_html=True)
-                
-                st.markdown("</div>", unsafe_allow_html=True)
-                
-                col_a, col_b, col_c = st.columns(3)
-                with col_a:
-                    if st.button("✅", key=f"accept_{post['id']}", help="Approve (Override AI)"):
-                        log_moderation_action(post['id'], "overridden", "Moderator", post['username'])
-                        st.success("Override")
-                with col_b:
-                    if st.button("✏️", key=f"edit_{post['id']}", help="Edit Post"):
-                        log_moderation_action(post['id'], "edited", "Moderator", post['username'])
-                        st.info("Edited")
-                with col_c:
-                    if st.button("👤", key=f"profile_f_{post['id']}", help="View User Profile"):
-                        st.session_state.viewing_user_profile = post['username']
-                        st.rerun()
+        if flagged_count:
+            if st.button("🧹 Redact all contact details", key="redact_flagged", use_container_width=True,
+                         help="Remove PII from every flagged post that no other moderator is reviewing"):
+                flagged_keys, _ = queue_index.page('flagged', None, flagged_count)
+                redacted = redact_posts(post_store.get_posts(flagged_keys))
+                st.success(f"Redacted {len(redacted)} post(s); they are being re-analyzed")
+            
+            flagged_posts = queue_page('flagged')
+            claims = shared_moderation.claims.status(post_key_for(post) for post in flagged_posts)
+            for post in flagged_posts:
+                post_key = post_key_for(post)
+                render_flagged_card(post)
+                render_review_actions(post_key, post, *claims[post_key])
         else:
             st.success("✅ No violations detected")
+        queue_pager('flagged')
     
     st.markdown("---")
 
+if st.session_state.viewing_user_profile:
+    with perf_metrics.phase('render'):
+        show_user_profile(st.session_state.viewing_user_profile)
+
+else:
+    live_queue()
+    if auto_refresh:
+        live_poller()
+
+if perf_metrics.enabled and PERF_METRICS_FILE:
+    perf_metrics.write_textfile(PERF_METRICS_FILE)
+
 st.markdown("---")
 st.caption("eBay AI Moderation Dashboard v6.0 | Auto-Classification | Real-Time Analysis | Production Ready")
 st.caption("💡 Posts from Forum App are automatically analyzed and classified in real-time")
@@ -0,0 +1,213 @@
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Timing starts switched on when PERF_METRICS=1; the dashboard panel can toggle it
+PERF_METRICS = os.environ.get('PERF_METRICS', '0') == '1'
+# Prometheus text exposition: a file rewritten every rerun and/or a local port
+PERF_METRICS_FILE = os.environ.get('PERF_METRICS_FILE')
+PERF_METRICS_PORT = int(os.environ.get('PERF_METRICS_PORT', 0))
+
+
+# ================================
+# RULE TIMINGS
+# ================================
+
+class RuleStats:
+    """Per-rule call count, hit count and cumulative seconds
+
+    Not locked: each analysis thread or worker fills its own and the
+    totals are merged into PerfMetrics under its lock.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def record(self, rule, seconds, hit):
+        """Count one rule evaluation"""
+        counts = self.counts.get(rule)
+        if counts is None:
+            counts = self.counts[rule] = [0, 0, 0.0]
+        counts[0] += 1
+        counts[1] += hit
+        counts[2] += seconds
+
+    def merge(self, counts):
+        """Add another RuleStats' counts into this one"""
+        for rule, (calls, hits, seconds) in counts.items():
+            mine = self.counts.get(rule)
+            if mine is None:
+                mine = self.counts[rule] = [0, 0, 0.0]
+            mine[0] += calls
+            mine[1] += hits
+            mine[2] += seconds
+
+
+# ================================
+# PROCESS-WIDE METRICS
+# ================================
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by obj and everything reachable from it"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, array)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+class PerfMetrics:
+    """Rule timings, per-rerun phase timings and gauges for one process
+
+    While disabled, phase() and rule_stats() return immediately and the
+    analysis path runs untimed.
+    """
+
+    def __init__(self, enabled=PERF_METRICS):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.rules = RuleStats()
+        self.phases = {}
+        self.gauges = {}
+
+    def rule_stats(self):
+        """A fresh RuleStats to time one batch of analysis, or None when disabled"""
+        return RuleStats() if self.enabled else None
+
+    def merge_rules(self, counts):
+        """Fold a batch's rule counts into the process totals"""
+        if counts:
+            with self.lock:
+                self.rules.merge(counts)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one run of a rerun phase"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def record_phase(self, name, seconds):
+        """Add one run of a phase: [runs, total seconds, last seconds]"""
+        with self.lock:
+            timing = self.phases.get(name)
+            if timing is None:
+                timing = self.phases[name] = [0, 0.0, 0.0]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = seconds
+
+    def set_gauge(self, name, value):
+        """Record the latest value of a gauge"""
+        with self.lock:
+            self.gauges[name] = value
+
+    def reset(self):
+        """Forget every timing and gauge"""
+        with self.lock:
+            self.rules = RuleStats()
+            self.phases = {}
+            self.gauges = {}
+
+    def snapshot(self):
+        """Copies of the rule timings, phase timings and gauges"""
+        with self.lock:
+            return (
+                {rule: list(counts) for rule, counts in self.rules.counts.items()},
+                {name: list(timing) for name, timing in self.phases.items()},
+                dict(self.gauges),
+            )
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        rules, phases, gauges = self.snapshot()
+        lines = [
+            "# HELP moderation_rule_calls_total Rule evaluations while timing was enabled.",
+            "# TYPE moderation_rule_calls_total counter",
+        ]
+        lines += [f'moderation_rule_calls_total{{rule="{rule}"}} {counts[0]}' for rule, counts in rules.items()]
+        lines += [
+            "# HELP moderation_rule_hits_total Rule evaluations that produced a violation.",
+            "# TYPE moderation_rule_hits_total counter",
+        ]
+        lines += [f'moderation_rule_hits_total{{rule="{rule}"}} {counts[1]}' for rule, counts in rules.items()]
+        lines += [
+            "# HELP moderation_rule_seconds_total Cumulative time spent in each rule.",
+            "# TYPE moderation_rule_seconds_total counter",
+        ]
+        lines += [f'moderation_rule_seconds_total{{rule="{rule}"}} {counts[2]:.6f}' for rule, counts in rules.items()]
+        lines += [
+            "# HELP moderation_phase_runs_total Dashboard rerun phases timed.",
+            "# TYPE moderation_phase_runs_total counter",
+        ]
+        lines += [f'moderation_phase_runs_total{{phase="{name}"}} {timing[0]}' for name, timing in phases.items()]
+        lines += [
+            "# HELP moderation_phase_seconds_total Cumulative time per dashboard rerun phase.",
+            "# TYPE moderation_phase_seconds_total counter",
+        ]
+        lines += [f'moderation_phase_seconds_total{{phase="{name}"}} {timing[1]:.6f}' for name, timing in phases.items()]
+        lines += [
+            "# HELP moderation_phase_last_seconds Duration of the latest run of each phase.",
+            "# TYPE moderation_phase_last_seconds gauge",
+        ]
+        lines += [f'moderation_phase_last_seconds{{phase="{name}"}} {timing[2]:.6f}' for name, timing in phases.items()]
+        for name, value in gauges.items():
+            lines += [f"# TYPE moderation_{name} gauge", f"moderation_{name} {value}"]
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically rewrite path with the current exposition"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as metrics_file:
+            metrics_file.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the exposition at http://host:port/metrics from a daemon thread"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='perf-metrics', daemon=True).start()
+        return server
@@ -0,0 +1,375 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# ================================
+# SHARED POST STORE
+# ================================
+
+DB_PATH = os.environ.get('EBAY_FORUM_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'forum_posts.db'))
+
+# Forum-owned post fields live in `data`; the dashboard's analysis fields
+# live in `analysis`, so neither app can clobber the other's writes. The
+# forum pages its feed straight from here, so every filter (status or
+# board) and ordering (time or report count) has an index to walk.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_key TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    board TEXT,
+    status TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL,
+    ai_analyzed INTEGER NOT NULL DEFAULT 0,
+    analysis TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    analyzing_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts(timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_username ON posts(username);
+CREATE INDEX IF NOT EXISTS idx_posts_version ON posts(version);
+CREATE INDEX IF NOT EXISTS idx_posts_pending ON posts(ai_analyzed) WHERE ai_analyzed = 0;
+CREATE INDEX IF NOT EXISTS idx_posts_status_timestamp ON posts(status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_board_timestamp ON posts(board, timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_reports ON posts(json_array_length(data, '$.reports') DESC, timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_status_reports ON posts(status, json_array_length(data, '$.reports') DESC, timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_board_reports ON posts(board, json_array_length(data, '$.reports') DESC, timestamp);
+
+-- Every analysis result in the order it was saved, whichever process made
+-- it, so each dashboard process can log every decision exactly once, dated
+-- when it was made rather than when it is read
+CREATE TABLE IF NOT EXISTS decisions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_key TEXT NOT NULL,
+    result TEXT NOT NULL,
+    decided_at TEXT
+);
+"""
+
+# Every write stamps the row with the next store-wide version, so readers
+# can fetch exactly the rows changed since the last version they saw.
+NEXT_VERSION = "(SELECT COALESCE(MAX(version), 0) + 1 FROM posts)"
+
+ANALYSIS_FIELDS = ['overall_status', 'confidence', 'priority', 'violations_detected']
+
+REPORT_TOTAL = "json_array_length(data, '$.reports')"
+
+# Every ordering ends in rowid, which each index holds implicitly, so a
+# page can seek straight to where the previous one ended
+ORDERINGS = {
+    'newest': 'timestamp DESC, rowid DESC',
+    'oldest': 'timestamp ASC, rowid ASC',
+    # Matches the *_reports indexes, so the forum's "Most Reports" feed is an index walk
+    'most_reported': f"{REPORT_TOTAL} DESC, timestamp ASC, rowid ASC",
+}
+
+
+def post_key_for(post):
+    """Storage key used for a post throughout both apps"""
+    return f"forum_post_{post['id']}"
+
+
+def row_to_post(row):
+    """Reassemble a post dict from its stored columns"""
+    post = json.loads(row['data'])
+    post['ai_analyzed'] = bool(row['ai_analyzed'])
+    if row['analysis']:
+        post.update(json.loads(row['analysis']))
+    return post
+
+
+class PostStore:
+    """SQLite (WAL mode) post store shared by the forum and the dashboard
+
+    Every thread gets its own connection, so Streamlit sessions read
+    concurrently while writes serialize inside SQLite.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as conn:
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(posts)")}
+            if columns and 'version' not in columns:
+                conn.execute("ALTER TABLE posts ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                conn.execute("UPDATE posts SET version = rowid")
+            if columns and 'analyzing_until' not in columns:
+                conn.execute("ALTER TABLE posts ADD COLUMN analyzing_until REAL")
+            decision_columns = {row['name'] for row in conn.execute("PRAGMA table_info(decisions)")}
+            if decision_columns and 'decided_at' not in decision_columns:
+                conn.execute("ALTER TABLE decisions ADD COLUMN decided_at TEXT")
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def upsert_posts(self, posts, lease_seconds=None):
+        """Insert or update forum-owned fields for many posts in one transaction
+
+        With lease_seconds the posts are also claimed for analysis, as
+        claim_pending would, without a second write.
+        """
+        claimed_until = None if lease_seconds is None else time.time() + lease_seconds
+        rows = [
+            (post_key_for(post), post['id'], post['username'], post.get('board'),
+             post.get('status', 'pending'), post.get('timestamp'), json.dumps(post), claimed_until)
+            for post in posts
+        ]
+        if not rows:
+            return 0
+        with self.connection() as conn:
+            conn.executemany(f"""
+                INSERT INTO posts (post_key, id, username, board, status, timestamp, data, analyzing_until, version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, {NEXT_VERSION})
+                ON CONFLICT(post_key) DO UPDATE SET
+                    username = excluded.username,
+                    board = excluded.board,
+                    status = excluded.status,
+                    timestamp = excluded.timestamp,
+                    data = excluded.data,
+                    analyzing_until = COALESCE(excluded.analyzing_until, analyzing_until),
+                    version = excluded.version
+            """, rows)
+        return len(rows)
+
+    def save_analysis(self, analyses):
+        """Store AI analysis results, given as {post_key: result dict}, and append them to the decision log"""
+        rows = [
+            (json.dumps({field: result[field] for field in ANALYSIS_FIELDS}), post_key)
+            for post_key, result in analyses.items()
+        ]
+        if not rows:
+            return 0
+        decided_at = datetime.now().isoformat()
+        with self.connection() as conn:
+            conn.executemany(f"""
+                UPDATE posts SET ai_analyzed = 1, analysis = ?, analyzing_until = NULL, version = {NEXT_VERSION}
+                WHERE post_key = ?
+            """, rows)
+            conn.executemany(
+                "INSERT INTO decisions (post_key, result, decided_at) VALUES (?, ?, ?)",
+                [(post_key, json.dumps(result), decided_at) for post_key, result in analyses.items()]
+            )
+        return len(rows)
+
+    def edit_contents(self, edits, note=""):
+        """Replace the content of many posts, given as {post_key: content}, in one transaction
+
+        Only the content and moderation note change inside the forum-owned
+        data, and the posts go back to the pending-analysis queue so the
+        edited text is re-classified.
+        """
+        rows = [(content, note, post_key) for post_key, content in edits.items()]
+        if not rows:
+            return 0
+        with self.connection() as conn:
+            conn.executemany(f"""
+                UPDATE posts SET
+                    data = json_set(data, '$.content', ?, '$.moderation_note', ?),
+                    ai_analyzed = 0,
+                    analysis = NULL,
+                    analyzing_until = NULL,
+                    version = {NEXT_VERSION}
+                WHERE post_key = ?
+            """, rows)
+        return len(rows)
+
+    def add_replies(self, replies):
+        """Append one reply per post, given as {post_key: reply dict}, in one transaction
+
+        Like edit_contents, only the replies list changes inside the
+        forum-owned data, so a redaction or analysis written since the
+        post was read is kept.
+        """
+        return self.append_to_list('replies', replies)
+
+    def add_reports(self, reports):
+        """Append one report per post, given as {post_key: report dict}, and count it in report_count"""
+        return self.append_to_list(
+            'reports', reports, ", '$.report_count', COALESCE(json_extract(data, '$.report_count'), 0) + 1"
+        )
+
+    def append_to_list(self, field, items, extra_sets=""):
+        """Append each item to its post's data list field, plus any extra json_set pairs"""
+        rows = [(json.dumps(item), post_key) for post_key, item in items.items()]
+        if not rows:
+            return 0
+        with self.connection() as conn:
+            conn.executemany(f"""
+                UPDATE posts SET
+                    data = json_set(data, '$.{field}', json_insert(
+                        COALESCE(json_extract(data, '$.{field}'), json('[]')), '$[#]', json(?)
+                    ){extra_sets}),
+                    version = {NEXT_VERSION}
+                WHERE post_key = ?
+            """, rows)
+        return len(rows)
+
+    def get_post(self, post_key):
+        """A single post, or None"""
+        row = self.connection().execute(
+            "SELECT * FROM posts WHERE post_key = ?", (post_key,)
+        ).fetchone()
+        return row_to_post(row) if row else None
+
+    def where_clause(self, status=None, board=None, username=None, seek=((), ())):
+        """SQL filter and parameters for the indexed columns, plus (conditions, params) to seek past"""
+        conditions, params = [], []
+        for column, value in (('status', status), ('board', board), ('username', username)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        conditions.extend(seek[0])
+        params.extend(seek[1])
+        return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+    def query_posts(self, status=None, board=None, username=None, order='newest', limit=50, after=None):
+        """One page of posts matching the filters, and the cursor of the next page (None on the last)
+
+        Pass the cursor back as after for the following page. Pages seek
+        from the cursor along the ordering's index instead of skipping an
+        offset, so a deep page costs the same as the first.
+        """
+        # (conditions, params, ordering) of each query the page is read from, in turn
+        if after is None:
+            seeks = [((), (), ORDERINGS[order])]
+        elif order == 'newest':
+            seeks = [(["(timestamp, rowid) < (?, ?)"], after, ORDERINGS[order])]
+        elif order == 'oldest':
+            seeks = [(["(timestamp, rowid) > (?, ?)"], after, ORDERINGS[order])]
+        else:
+            # Mixed sort directions are no single row-value seek: finish the
+            # cursor's report total, then carry on with the lower totals
+            seeks = [
+                ([f"{REPORT_TOTAL} IS ?", "(timestamp, rowid) > (?, ?)"], after, 'timestamp ASC, rowid ASC'),
+                ([f"{REPORT_TOTAL} < ?"], after[:1], ORDERINGS[order]),
+            ]
+
+        rows = []
+        for conditions, seek_params, ordering in seeks:
+            where, params = self.where_clause(status, board, username, (conditions, seek_params))
+            rows += self.connection().execute(
+                f"SELECT rowid AS position, {REPORT_TOTAL} AS report_total, * FROM posts{where} "
+                f"ORDER BY {ordering} LIMIT ?",
+                params + [limit + 1 - len(rows)]
+            ).fetchall()
+            if len(rows) > limit:
+                break
+
+        cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            cursor = (last['timestamp'], last['position'])
+            if order == 'most_reported':
+                cursor = (last['report_total'],) + cursor
+        return [row_to_post(row) for row in rows[:limit]], cursor
+
+    def count_posts(self, status=None, board=None, username=None):
+        """Number of posts matching the filters"""
+        where, params = self.where_clause(status, board, username)
+        return self.connection().execute(f"SELECT COUNT(*) FROM posts{where}", params).fetchone()[0]
+
+    def get_posts(self, post_keys):
+        """Many posts keyed by storage key, fetched in one query"""
+        post_keys = list(post_keys)
+        if not post_keys:
+            return {}
+        placeholders = ', '.join('?' * len(post_keys))
+        rows = self.connection().execute(
+            f"SELECT * FROM posts WHERE post_key IN ({placeholders})", post_keys
+        ).fetchall()
+        return {row['post_key']: row_to_post(row) for row in rows}
+
+    def latest_version(self):
+        """Newest version written to the store (0 when empty)"""
+        return self.connection().execute("SELECT COALESCE(MAX(version), 0) FROM posts").fetchone()[0]
+
+    def changed_since(self, version):
+        """Posts written after version, plus the newest version seen"""
+        rows = self.connection().execute(
+            "SELECT * FROM posts WHERE version > ? ORDER BY version", (version,)
+        ).fetchall()
+        latest = rows[-1]['version'] if rows else version
+        return {row['post_key']: row_to_post(row) for row in rows}, latest
+
+    def pending_analysis(self, limit=None):
+        """Unanalyzed posts keyed by storage key, in arrival order
+
+        Served from a partial index that only holds unanalyzed rows, so
+        the cost tracks the backlog rather than the total number of posts.
+        """
+        rows = self.connection().execute(
+            "SELECT * FROM posts WHERE ai_analyzed = 0 ORDER BY rowid LIMIT ?",
+            (-1 if limit is None else limit,)
+        ).fetchall()
+        return {row['post_key']: row_to_post(row) for row in rows}
+
+    def claim_pending(self, limit, lease_seconds):
+        """Claim up to limit unanalyzed posts for lease_seconds, keyed by storage key in arrival order
+
+        A claimed post is skipped by every other claim until its analysis
+        is saved or the lease runs out, so the dashboard and the ingest
+        server never analyze the same post twice. A process that dies
+        mid-analysis only delays its posts by one lease.
+        """
+        if limit <= 0:
+            return {}
+        now = time.time()
+        with self.connection() as conn:
+            rows = conn.execute("""
+                UPDATE posts SET analyzing_until = ?
+                WHERE post_key IN (
+                    SELECT post_key FROM posts
+                    WHERE ai_analyzed = 0 AND (analyzing_until IS NULL OR analyzing_until < ?)
+                    ORDER BY rowid LIMIT ?
+                )
+                RETURNING rowid AS position, *
+            """, (now + lease_seconds, now, limit)).fetchall()
+        rows.sort(key=lambda row: row['position'])
+        return {row['post_key']: row_to_post(row) for row in rows}
+
+    def release_claims(self, post_keys):
+        """Give up claims on posts that were not analyzed, so the next claim picks them up"""
+        rows = [(post_key,) for post_key in post_keys]
+        if rows:
+            with self.connection() as conn:
+                conn.executemany("UPDATE posts SET analyzing_until = NULL WHERE post_key = ? AND ai_analyzed = 0", rows)
+
+    def latest_decision(self):
+        """Sequence number of the newest logged decision (0 when none)"""
+        return self.connection().execute("SELECT COALESCE(MAX(seq), 0) FROM decisions").fetchone()[0]
+
+    def decisions_since(self, seq, limit=-1):
+        """Up to limit decisions logged after seq, oldest first
+
+        Each is (seq, post_key, post_id, username, result, decided_at);
+        decided_at is None for decisions logged before it was recorded.
+        """
+        rows = self.connection().execute("""
+            SELECT decisions.seq, decisions.post_key, posts.id, posts.username, decisions.result, decisions.decided_at
+            FROM decisions JOIN posts ON posts.post_key = decisions.post_key
+            WHERE decisions.seq > ? ORDER BY decisions.seq LIMIT ?
+        """, (seq, limit)).fetchall()
+        return [
+            (row[0], row[1], row[2], row[3], json.loads(row[4]), row[5] and datetime.fromisoformat(row[5]))
+            for row in rows
+        ]
+
+    def load_posts(self):
+        """Every post keyed by storage key, oldest first"""
+        rows = self.connection().execute(
+            f"SELECT * FROM posts ORDER BY {ORDERINGS['oldest']}"
+        ).fetchall()
+        return {row['post_key']: row_to_post(row) for row in rows}
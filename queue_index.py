@@ -0,0 +1,362 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from heapq import heappop, heappush
+
+# ================================
+# QUEUE COLUMN ORDERINGS
+# ================================
+
+PRIORITY_ORDER = {'critical': 0, 'high': 1, 'medium': 2}
+
+
+def approved_key(post):
+    """AI Approved column: clean posts in arrival order"""
+    if post.get('ai_analyzed') and post.get('overall_status') == 'assured':
+        return (post.get('timestamp', ''),)
+    return None
+
+
+def reported_key(post):
+    """User Reported column: most reported first"""
+    report_count = len(post.get('reports', []))
+    if report_count > 0:
+        return (-report_count, post.get('timestamp', ''))
+    return None
+
+
+def flagged_key(post):
+    """AI Flagged column: highest priority first"""
+    if post.get('ai_analyzed') and post.get('overall_status') == 'flagged':
+        return (PRIORITY_ORDER.get(post.get('priority', 'low'), 3), post.get('timestamp', ''))
+    return None
+
+
+QUEUE_COLUMNS = {
+    'approved': approved_key,
+    'reported': reported_key,
+    'flagged': flagged_key,
+}
+
+
+# ================================
+# SORTED COLUMN INDEX
+# ================================
+
+class SortedColumn:
+    """Post keys kept in sort order, paged with cursors
+
+    Entries are (sort_key, post_key) tuples in a sorted list; a cursor is
+    the last entry of the previous page, so fetching a page is a bisect
+    plus a k-element slice.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.sort_keys = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def upsert(self, post_key, sort_key):
+        """Place post_key at sort_key, moving it if it was already present"""
+        if self.sort_keys.get(post_key) == sort_key:
+            return
+        self.discard(post_key)
+        self.sort_keys[post_key] = sort_key
+        insort(self.entries, (sort_key, post_key))
+
+    def discard(self, post_key):
+        """Remove post_key if present"""
+        sort_key = self.sort_keys.pop(post_key, None)
+        if sort_key is None:
+            return
+        position = bisect_left(self.entries, (sort_key, post_key))
+        del self.entries[position]
+
+    def page(self, cursor=None, limit=10):
+        """Up to limit post keys after cursor, and the cursor for the next page"""
+        start = 0 if cursor is None else bisect_right(self.entries, cursor)
+        entries = self.entries[start:start + limit]
+        next_cursor = entries[-1] if entries and start + limit < len(self.entries) else None
+        return [post_key for _, post_key in entries], next_cursor
+
+
+class QueueIndex:
+    """Per-column ordered indexes over the posts in the store
+
+    Only sort keys are kept; callers fetch the posts on a page from the
+    store. Every method holds the index's lock, so dashboard sessions can
+    share one index.
+    """
+
+    def __init__(self, posts=None):
+        self.columns = {name: SortedColumn() for name in QUEUE_COLUMNS}
+        self.post_keys = set()
+        self.lock = threading.Lock()
+        for post_key, post in (posts or {}).items():
+            self.update(post_key, post)
+
+    def __len__(self):
+        """Number of posts seen, in any column or none"""
+        return len(self.post_keys)
+
+    def update(self, post_key, post):
+        """Re-file a new or changed post in every column"""
+        with self.lock:
+            self.post_keys.add(post_key)
+            for name, key_for in QUEUE_COLUMNS.items():
+                sort_key = key_for(post)
+                if sort_key is None:
+                    self.columns[name].discard(post_key)
+                else:
+                    self.columns[name].upsert(post_key, sort_key)
+
+    def count(self, name):
+        """Number of posts in a column"""
+        with self.lock:
+            return len(self.columns[name])
+
+    def page(self, name, cursor=None, limit=10):
+        """One page of a column: (post keys, next cursor)"""
+        with self.lock:
+            return self.columns[name].page(cursor, limit)
+
+
+# ================================
+# REVIEW PRIORITY QUEUE
+# ================================
+
+# Review score points per severity level above low, per user report, per
+# violation on the author's record and per hour the post has waited
+REVIEW_WEIGHTS = {'severity': 100, 'report': 30, 'author_violation': 10, 'hour': 5}
+# Violations on record beyond this no longer raise an author's posts
+AUTHOR_HISTORY_CAP = 10
+# Hours of waiting beyond this no longer raise a post; 12 hours at 5 points
+# stays below one severity step, so old posts cannot outrank worse new ones
+AGE_CAP_HOURS = 12
+
+
+def needs_review(post):
+    """Flagged by the rules or reported by a user"""
+    return flagged_key(post) is not None or reported_key(post) is not None
+
+
+def posted_epoch(post):
+    """Posting time in epoch seconds; posts without a readable timestamp count as new"""
+    try:
+        return datetime.strptime(post.get('timestamp', ''), '%Y-%m-%d %H:%M:%S').timestamp()
+    except ValueError:
+        return datetime.now().timestamp()
+
+
+class IndexedHeap:
+    """Binary min-heap of (key, post_key) items with every post's slot indexed
+
+    positions maps each post to its slot, so a changed key is sifted up or
+    down in place and place and discard are O(log n). Not locked: the
+    owner serializes access.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, post_key):
+        return post_key in self.positions
+
+    def place(self, post_key, key):
+        """Insert post_key or move it to key"""
+        slot = self.positions.get(post_key)
+        if slot is None:
+            slot = len(self.items)
+            self.items.append((key, post_key))
+        else:
+            self.items[slot] = (key, post_key)
+        self.positions[post_key] = slot
+        self.sift(slot)
+
+    def discard(self, post_key):
+        """Remove post_key if present"""
+        slot = self.positions.pop(post_key, None)
+        if slot is None:
+            return
+        last = self.items.pop()
+        if slot < len(self.items):
+            self.items[slot] = last
+            self.positions[last[1]] = slot
+            self.sift(slot)
+
+    def sift(self, slot):
+        """Restore the heap order around one changed slot"""
+        items, positions = self.items, self.positions
+        item = items[slot]
+        while slot > 0:
+            parent = (slot - 1) // 2
+            if items[parent] <= item:
+                break
+            items[slot] = items[parent]
+            positions[items[slot][1]] = slot
+            slot = parent
+        while True:
+            child = 2 * slot + 1
+            if child >= len(items):
+                break
+            if child + 1 < len(items) and items[child + 1] < items[child]:
+                child += 1
+            if item <= items[child]:
+                break
+            items[slot] = items[child]
+            positions[items[slot][1]] = slot
+            slot = child
+        items[slot] = item
+        positions[item[1]] = slot
+
+
+class ReviewQueue:
+    """Posts awaiting review, highest review score first
+
+    A post's score adds up its severity, report count, the author's
+    violations on record and the hours it has waited, up to
+    age_cap_hours. Keys must not change as time passes, so posts live in
+    one of two indexed heaps:
+
+    fresh    posts still gaining age points. The age term grows at the
+             same rate for all of them, so the key subtracts the posting
+             time instead of adding the waiting time.
+    capped   posts past the cap, keyed by their score alone. They all
+             share the same age bonus, added when the heaps are compared.
+
+    Each post moves from fresh to capped once, in posting order, when
+    next_post finds it past the cap. Keys otherwise change only when a
+    post or its author does, so update, discard and next_post are
+    O(log n). Every method holds the queue's lock, so dashboard sessions
+    can share one queue.
+    """
+
+    def __init__(self, weights=REVIEW_WEIGHTS, age_cap_hours=AGE_CAP_HOURS):
+        self.weights = weights
+        self.age_cap = age_cap_hours * 3600
+        self.lock = threading.Lock()
+        self.fresh = IndexedHeap()
+        self.capped = IndexedHeap()
+        # (posted epoch, post_key) of posts filed as fresh, oldest first;
+        # entries for posts since dropped or re-timed are skipped when popped
+        self.by_posted = []
+        # Posts posted before this epoch have reached the age cap
+        self.horizon = float('-inf')
+        # post_key -> (author, score without the author term, posted epoch)
+        self.entries = {}
+        self.authors = {}
+        self.author_violations = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---------- scores ----------
+
+    def author_points(self, author):
+        return self.weights['author_violation'] * min(self.author_violations.get(author, 0), AUTHOR_HISTORY_CAP)
+
+    def score(self, post_key, now=None):
+        """Current review score of a queued post, or None"""
+        with self.lock:
+            if post_key not in self.entries:
+                return None
+            author, points, posted = self.entries[post_key]
+            waited = min(max(0.0, (now or datetime.now().timestamp()) - posted), self.age_cap)
+            return points + self.author_points(author) + self.weights['hour'] * waited / 3600
+
+    # ---------- updates ----------
+
+    def update(self, post_key, post):
+        """Queue, re-prioritize or drop a new or changed post"""
+        if not needs_review(post):
+            self.discard(post_key)
+            return
+        severity = 3 - PRIORITY_ORDER.get(post.get('priority', 'low'), 3) if flagged_key(post) else 0
+        points = self.weights['severity'] * severity + self.weights['report'] * len(post.get('reports', []))
+        entry = (post['username'], points, posted_epoch(post))
+
+        with self.lock:
+            previous = self.entries.get(post_key)
+            if previous == entry:
+                return
+            if previous is not None and previous[0] != entry[0]:
+                self.authors[previous[0]].discard(post_key)
+            if previous is None or previous[2] != entry[2]:
+                heappush(self.by_posted, (entry[2], post_key))
+            self.entries[post_key] = entry
+            self.authors.setdefault(entry[0], set()).add(post_key)
+            self.place(post_key)
+
+    def discard(self, post_key):
+        """Drop a post, e.g. once a moderator has handled it"""
+        with self.lock:
+            entry = self.entries.pop(post_key, None)
+            if entry is None:
+                return
+            self.authors[entry[0]].discard(post_key)
+            self.fresh.discard(post_key)
+            self.capped.discard(post_key)
+
+    def set_author_violations(self, author, violations):
+        """Record an author's violations on record and re-prioritize their queued posts"""
+        with self.lock:
+            if self.author_violations.get(author, 0) == violations:
+                return
+            self.author_violations[author] = violations
+            for post_key in self.authors.get(author, ()):
+                self.place(post_key)
+
+    def place(self, post_key):
+        """Put post_key in the heap for its age at its current key (lock held)"""
+        author, points, posted = self.entries[post_key]
+        key = -points - self.author_points(author)
+        if posted < self.horizon:
+            self.fresh.discard(post_key)
+            self.capped.place(post_key, key)
+        else:
+            self.capped.discard(post_key)
+            self.fresh.place(post_key, key + self.weights['hour'] * posted / 3600)
+
+    def age(self, now):
+        """Move fresh posts that have reached the age cap to the capped heap (lock held)"""
+        self.horizon = max(self.horizon, now - self.age_cap)
+        while self.by_posted and self.by_posted[0][0] < self.horizon:
+            posted, post_key = heappop(self.by_posted)
+            entry = self.entries.get(post_key)
+            if entry is not None and entry[2] == posted and post_key in self.fresh:
+                self.place(post_key)
+
+    # ---------- reading ----------
+
+    def next_post(self, accept=None, now=None):
+        """Highest-priority post_key that accept(post_key) takes, or None
+
+        Declined posts stay queued. The walk starts at both heaps' roots
+        and only opens the children of declined posts, in key order, so
+        the answer is a root when nothing is declined and skipping k posts
+        (say, ones other moderators hold) costs O(k log k).
+        """
+        with self.lock:
+            self.age(now or datetime.now().timestamp())
+            # The capped posts' shared age bonus, on the fresh keys' scale
+            capped_shift = self.weights['hour'] * self.horizon / 3600 if self.capped.items else 0.0
+            candidates = []
+            for heap, shift in ((self.fresh, 0.0), (self.capped, capped_shift)):
+                if heap.items:
+                    key, post_key = heap.items[0]
+                    heappush(candidates, (key + shift, post_key, heap, shift, 0))
+            while candidates:
+                _, post_key, heap, shift, slot = heappop(candidates)
+                if accept is None or accept(post_key):
+                    return post_key
+                for child in (2 * slot + 1, 2 * slot + 2):
+                    if child < len(heap.items):
+                        key, child_key = heap.items[child]
+                        heappush(candidates, (key + shift, child_key, heap, shift, child))
+            return None
@@ -0,0 +1,246 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+
+from moderation_stats import ModerationStats, export_batches
+from queue_index import QueueIndex, ReviewQueue
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Seconds a moderator keeps a claimed post before others may take it over
+CLAIM_LEASE_SECONDS = int(os.environ.get('CLAIM_LEASE_SECONDS', 300))
+# Most recently handled posts whose moderator and action are remembered
+RESOLVED_POSTS_SIZE = int(os.environ.get('RESOLVED_POSTS_SIZE', 100000))
+# Decisions from the store's log handed to one session per rerun
+DECISION_BATCH_SIZE = int(os.environ.get('DECISION_BATCH_SIZE', 5000))
+
+
+# ================================
+# POST CLAIMS
+# ================================
+
+class ClaimBoard:
+    """Leases that assign each post to one moderator at a time
+
+    A claim lasts lease_seconds unless renewed by claiming again, so a
+    closed tab never locks a post for good. complete() records who acted
+    on a post; after that nobody can claim or act on it again until it is
+    reopen()ed, which is what keeps two moderators from handling the same
+    post. Only the resolved_size most recently handled posts are
+    remembered; older ones can be claimed again.
+    """
+
+    def __init__(self, lease_seconds=CLAIM_LEASE_SECONDS, clock=time.monotonic, resolved_size=RESOLVED_POSTS_SIZE):
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.leases = {}
+        # post_key -> (moderator, action_type), oldest first
+        self.resolved = OrderedDict()
+        self.resolved_size = resolved_size
+
+    def current_holder(self, post_key, now):
+        """Moderator holding an unexpired lease on post_key (lock held)"""
+        lease = self.leases.get(post_key)
+        if lease is None:
+            return None
+        if lease[1] <= now:
+            del self.leases[post_key]
+            return None
+        return lease[0]
+
+    def claim(self, post_key, moderator):
+        """Take or renew the lease on a post; returns whoever holds it afterwards"""
+        with self.lock:
+            if post_key in self.resolved:
+                return None
+            now = self.clock()
+            holder = self.current_holder(post_key, now)
+            if holder in (None, moderator):
+                self.leases[post_key] = (moderator, now + self.lease_seconds)
+                return moderator
+            return holder
+
+    def release(self, post_key, moderator):
+        """Give up a lease held by moderator; False when it held none"""
+        with self.lock:
+            if self.current_holder(post_key, self.clock()) != moderator:
+                return False
+            del self.leases[post_key]
+            return True
+
+    def complete(self, post_key, moderator, action_type):
+        """Record moderator's action on a post unless someone else holds or handled it"""
+        with self.lock:
+            if post_key in self.resolved or self.current_holder(post_key, self.clock()) not in (None, moderator):
+                return False
+            self.leases.pop(post_key, None)
+            self.resolved[post_key] = (moderator, action_type)
+            if len(self.resolved) > self.resolved_size:
+                self.resolved.popitem(last=False)
+            return True
+
+    def reopen(self, post_keys):
+        """Forget who handled these posts, e.g. once edited posts are back in the queue"""
+        with self.lock:
+            for post_key in post_keys:
+                self.resolved.pop(post_key, None)
+
+    def handled(self, post_keys):
+        """The post keys someone has already acted on"""
+        with self.lock:
+            return {post_key for post_key in post_keys if post_key in self.resolved}
+
+    def status(self, post_keys):
+        """{post_key: (holder or None, (moderator, action_type) or None)} for a page of posts"""
+        with self.lock:
+            now = self.clock()
+            return {
+                post_key: (self.current_holder(post_key, now), self.resolved.get(post_key))
+                for post_key in post_keys
+            }
+
+    def claimed_by(self, moderator):
+        """Post keys currently leased to moderator"""
+        with self.lock:
+            now = self.clock()
+            return [post_key for post_key, (holder, expires) in self.leases.items()
+                    if holder == moderator and expires > now]
+
+
+# ================================
+# PROCESS-WIDE MODERATION STATE
+# ================================
+
+class SharedModeration:
+    """Moderation stats, post claims, the queue columns and the review queue shared by every dashboard session
+
+    Sessions buffer their log events in their own EventSink and hand the
+    whole batch over here on flush, so the stats lock is taken once per
+    rerun rather than once per event. Claims, the queue columns and the
+    review queue have their own locks and never wait on stats work.
+
+    pull_posts() brings the queue columns and review queue up to the
+    post store's version once for the whole process, so a new session
+    reads no posts beyond the pages it shows.
+
+    Analysis decisions come from the post store's decision log, whichever
+    process made them. take_decisions() hands each one to exactly one
+    session, so every decision is logged once per dashboard process.
+    """
+
+    def __init__(self, stats=None, claims=None, review_queue=None, queue_index=None):
+        self.stats = stats or ModerationStats()
+        self.lock = threading.Lock()
+        self.claims = claims or ClaimBoard()
+        self.review_queue = review_queue or ReviewQueue()
+        self.queue_index = queue_index or QueueIndex()
+        # Newest store version filed in the queue columns and review queue
+        self.posts_version = 0
+        self.posts_lock = threading.Lock()
+        self.moderator_ids = count(1)
+        # Newest decision log entry already handed to a session
+        self.decision_seq = 0
+        self.decision_lock = threading.Lock()
+
+    def next_moderator_name(self):
+        """Default display name for a new moderator session"""
+        return f"Moderator {next(self.moderator_ids)}"
+
+    def record_events(self, events):
+        """Log a batch of EventSink events (EventSink's stats interface)
+
+        Authors with new violations move their queued posts up the review
+        queue.
+        """
+        authors = {event[2] for event in events if event[0] == 'analysis' and event[3]['violations_detected']}
+        with self.lock:
+            self.stats.record_events(events)
+            records = {author: self.stats.get_user_profile(author).total_violations for author in authors}
+        for author, violations in records.items():
+            self.review_queue.set_author_violations(author, violations)
+
+    def take_decisions(self, store, limit=DECISION_BATCH_SIZE):
+        """The next decisions no session has taken yet, as (post_key, post_id, username, result, decided_at)"""
+        with self.decision_lock:
+            decisions = store.decisions_since(self.decision_seq, limit)
+            if decisions:
+                self.decision_seq = decisions[-1][0]
+        return [decision[1:] for decision in decisions]
+
+    # ---------- queue columns and review queue ----------
+
+    def pull_posts(self, store):
+        """File posts changed in the store since the last pull; False when already up to date"""
+        with self.posts_lock:
+            if store.latest_version() == self.posts_version:
+                return False
+            # Only posts changed since the last pull, analysis results included
+            changed_posts, self.posts_version = store.changed_since(self.posts_version)
+            for post_key, post in changed_posts.items():
+                self.queue_index.update(post_key, post)
+            # New analyses and reports re-prioritize posts in the review queue
+            self.file_for_review(changed_posts)
+        return True
+
+    def file_for_review(self, posts):
+        """Queue or re-prioritize new and changed {post_key: post}; handled posts stay out"""
+        handled = self.claims.handled(posts)
+        for post_key, post in posts.items():
+            if post_key in handled:
+                self.review_queue.discard(post_key)
+            else:
+                self.review_queue.update(post_key, post)
+
+    def claim_next(self, moderator):
+        """Claim the highest-priority queued post no other moderator holds; its post_key or None"""
+        return self.review_queue.next_post(lambda post_key: self.claims.claim(post_key, moderator) == moderator)
+
+    def complete(self, post_key, moderator, action_type):
+        """Record moderator's action on a post (see ClaimBoard.complete) and take it off the review queue"""
+        if not self.claims.complete(post_key, moderator, action_type):
+            return False
+        self.review_queue.discard(post_key)
+        return True
+
+    def update_user_profile(self, username, event_type, event_data, position=None):
+        """Update user profile with new events"""
+        with self.lock:
+            self.stats.update_user_profile(username, event_type, event_data, position)
+
+    def get_stats_for_period(self, start_date, end_date):
+        """Get comprehensive stats for date range"""
+        with self.lock:
+            return self.stats.get_stats_for_period(start_date, end_date)
+
+    def get_user_profile(self, username):
+        """(profile copy, recent violations, recent actions) newest first, or None
+
+        Entries are read while the lock is held, so the caller can render
+        them while other sessions keep logging.
+        """
+        with self.lock:
+            profile = self.stats.get_user_profile(username)
+            if profile is None:
+                return None
+            snapshot = copy.copy(profile)
+            snapshot.violation_types = dict(profile.violation_types)
+            snapshot.severity_counts = dict(profile.severity_counts)
+            violations = [self.stats.violation_log[p] for p in reversed(profile.recent_violations)]
+            actions = [self.stats.action_log[p] for p in reversed(profile.recent_actions)]
+        return snapshot, violations, actions
+
+    def export_period(self, log_name, start_date, end_date, file_format='parquet'):
+        """One log's entries for the inclusive date range as Parquet or CSV bytes
+
+        Only the period's record batches are taken under the lock; the file
+        is encoded after, so other sessions keep logging meanwhile.
+        """
+        with self.lock:
+            log, batches = self.stats.period_batches(log_name, start_date, end_date)
+        return export_batches(log, batches, file_format)
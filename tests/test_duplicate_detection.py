@@ -0,0 +1,77 @@
+from duplicate_detection import DuplicateScreen, NearDuplicateIndex
+from moderation_engine import current_engine
+
+LISTING = "Selling my vintage camera with two lenses and the original box, collection only"
+
+
+def post(post_id, content, username='alice'):
+    return f"forum_post_{post_id}", {'id': post_id, 'content': content, 'username': username}
+
+
+def screen_one(screen, post_id, content, username='alice'):
+    """prepare() one post, then remember what the rules find as the analysis service would"""
+    post_key, item = post(post_id, content, username)
+    ready, todo, duplicates = screen.prepare([(post_key, item)])
+    engine = current_engine()
+    detected = [(key, violations) for (key, _), violations in zip(todo, engine.detect_many([p['content'] for _, p in todo]))]
+    screen.remember({post_key: item}, detected, engine.fingerprint)
+    return ready, todo, duplicates
+
+
+def test_exact_repost_reuses_cached_violations():
+    screen = DuplicateScreen()
+    _, todo, _ = screen_one(screen, 'p1', "you idiot, call 07700900123")
+    assert len(todo) == 1
+    ready, todo, _ = screen_one(screen, 'p2', "you idiot, call 07700900123")
+    assert not todo
+    assert [v['type'] for v in ready[0][1]] == ['PII - Phone', 'Disrespect - Insult']
+
+
+def test_cache_matches_content_exactly():
+    """A reformatted repost is analyzed again: the rules are case and whitespace sensitive"""
+    screen = DuplicateScreen()
+    _, todo, _ = screen_one(screen, 'p1', "pickup from SW1A  1AA only")
+    assert len(todo) == 1
+    ready, todo, _ = screen_one(screen, 'p2', "pickup from SW1A 1AA only")
+    assert not ready and len(todo) == 1
+    _, todo, _ = screen_one(screen, 'p3', "PICKUP FROM SW1A  1AA ONLY")
+    assert len(todo) == 1
+
+
+def test_rules_change_misses_the_cache():
+    screen = DuplicateScreen()
+    key, item = post('p1', "hello there")
+    screen.remember({key: item}, [(key, [])], 'older-rules')
+    ready, todo, _ = screen.prepare([post('p2', "hello there")])
+    assert not ready and len(todo) == 1
+
+
+def test_near_duplicate_by_the_same_author_is_flagged():
+    screen = DuplicateScreen()
+    screen_one(screen, 'first', LISTING)
+    _, _, duplicates = screen_one(screen, 'second', LISTING + " please")
+    [violation] = duplicates['forum_post_second']
+    assert violation['type'] == current_engine().rules['duplicate']['type']
+    assert violation['evidence'].startswith("Matches post #first")
+
+
+def test_same_text_by_another_author_is_not_a_repost():
+    screen = DuplicateScreen()
+    screen_one(screen, 'first', LISTING, username='alice')
+    _, _, duplicates = screen_one(screen, 'second', LISTING, username='bob')
+    assert not duplicates
+
+
+def test_short_posts_are_never_duplicates():
+    index = NearDuplicateIndex(window=10)
+    assert not index.insert('a', "thanks for the help", 'alice')
+    assert not index.insert('b', "thanks for the help", 'alice')
+
+
+def test_window_evicts_the_oldest_posts():
+    index = NearDuplicateIndex(window=2)
+    index.insert('a', LISTING, 'alice')
+    index.insert('b', "Completely different text about a bicycle for sale in good condition", 'alice')
+    index.insert('c', "Yet another post that talks about garden furniture and some old tools", 'alice')
+    assert 'a' not in index.signatures
+    assert not index.insert('d', LISTING, 'alice')
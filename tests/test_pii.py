@@ -0,0 +1,51 @@
+import pytest
+
+from moderation_engine import RuleEngine, read_rules
+
+
+@pytest.fixture(scope='module')
+def engine():
+    """The shipped rules without the optional classifier"""
+    rules, fingerprint = read_rules()
+    return RuleEngine(rules, fingerprint)
+
+
+def test_every_occurrence_is_reported_once_per_type(engine):
+    """One violation per PII type, listing each distinct match as evidence"""
+    content = "Call 07700900123 or 07700900456 (or 07700900123), mail a@b.com, at SW1A 1AA"
+    violations = {v['type']: v['evidence'] for v in engine.detect(content)}
+    assert violations == {
+        'PII - Phone': '07700900123, 07700900456',
+        'PII - Email': 'a@b.com',
+        'PII - Address': 'SW1A 1AA',
+    }
+
+
+def test_scan_pii_spans_every_match_in_text_order(engine):
+    content = "Call 07700900123 or mail a@b.com, then 07700900456"
+    spans = engine.scan_pii(content)
+    assert [(pii_type, content[start:end]) for pii_type, start, end in spans] == [
+        ('Phone', '07700900123'), ('Email', 'a@b.com'), ('Phone', '07700900456'),
+    ]
+
+
+def test_redact_replaces_every_span(engine):
+    content = "Text 07700900123 or 07700900456, mail a@b.com"
+    assert engine.redact(content) == "Text [Phone removed] or [Phone removed], mail [Email removed]"
+    assert engine.redact("nothing to hide") == "nothing to hide"
+
+
+def test_redaction_spans_index_the_posted_content(engine):
+    """Full-width digits and zero-width characters are matched, and redacted where they were posted"""
+    content = "Call ０７７００９００１２３​ now, e-mail ｊｏｅ@example.com"
+    spans = engine.scan_pii(content)
+    assert [(pii_type, content[start:end]) for pii_type, start, end in spans] == [
+        ('Phone', '０７７００９００１２３'), ('Email', 'ｊｏｅ@example.com'),
+    ]
+    assert engine.redact(content, spans) == "Call [Phone removed]​ now, e-mail [Email removed]"
+
+
+def test_address_needs_the_posted_spacing(engine):
+    """The rules see whitespace as posted, so a doubled space is no postcode"""
+    assert not engine.detect("pickup from SW1A  1AA only")
+    assert [v['evidence'] for v in engine.detect("pickup from SW1A 1AA only")] == ['SW1A 1AA']
@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime
+
+from benchmarks.corpus import generate_posts
+from moderation_engine import RuleEngine, read_rules
+from post_store import post_key_for
+from shared_state import SharedModeration
+
+
+def analyzed_posts(size=2000):
+    """A synthetic corpus as analyzed posts, plus a new report on every tenth, both as {post_key: post}"""
+    rules, fingerprint = read_rules()
+    engine = RuleEngine(rules, fingerprint)
+    posts = {}
+    for post in generate_posts(size, seed=0):
+        result = engine.analyze(post['content'], post['id'])
+        post = dict(post, ai_analyzed=True, **{field: result[field] for field in
+                    ('overall_status', 'confidence', 'priority', 'violations_detected')})
+        posts[post_key_for(post)] = post
+    reported = {post_key: dict(post, reports=post['reports'] + [{'reporter': 'test'}])
+                for post_key, post in list(posts.items())[::10]}
+    return posts, reported
+
+
+def assert_heap_order(queue):
+    """Every heap slot is indexed and no child sorts before its parent"""
+    for heap in (queue.fresh, queue.capped):
+        for slot, item in enumerate(heap.items):
+            assert heap.positions[item[1]] == slot
+            assert slot == 0 or heap.items[(slot - 1) // 2] <= item
+    assert len(queue.fresh) + len(queue.capped) == len(queue.entries)
+
+
+def test_concurrent_claims():
+    """Moderator threads claiming from one shared queue until it is empty
+
+    The filed queue must be in heap order with the best-scoring post
+    first, and every post must be claimed exactly once.
+    """
+    posts, reported = analyzed_posts()
+    shared = SharedModeration()
+    shared.file_for_review(posts)
+    shared.file_for_review(reported)
+    queue = shared.review_queue
+    assert_heap_order(queue)
+    now = datetime.now().timestamp()
+    best = max(queue.score(post_key, now) for post_key in queue.entries)
+    assert queue.score(queue.next_post(now=now), now) == best
+    queued = len(queue)
+    assert queued
+
+    claims, failures = [], []
+
+    def moderate(moderator):
+        try:
+            post_key = shared.claim_next(moderator)
+            while post_key is not None:
+                claims.append(post_key)
+                shared.complete(post_key, moderator, 'overridden')
+                post_key = shared.claim_next(moderator)
+        except Exception as exc:
+            failures.append(exc)
+
+    threads = [threading.Thread(target=moderate, args=(f'moderator_{n}',)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not failures
+    assert len(claims) == len(set(claims)) == queued
+    assert not len(queue) and not queue.fresh.items and not queue.capped.items
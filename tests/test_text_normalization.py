@@ -0,0 +1,51 @@
+from text_normalization import NormalizedText
+
+# Behavior of the shared normalized forms every rule matches against.
+
+
+def test_ascii_content_is_kept_as_text():
+    """ASCII posts skip the Unicode work: text is the content, spans map to themselves"""
+    text = NormalizedText("Seller Bob is a SCAMMER")
+    assert text.text == "Seller Bob is a SCAMMER"
+    assert text.lower == "seller bob is a scammer"
+    assert text.raw_span(7, 10) == (7, 10)
+
+
+def test_leetspeak_folds_only_next_to_letters():
+    """Digits and symbols inside words read as letters; prices and a closing "!" stay"""
+    assert NormalizedText("Y0u 1d10t!").folded == "you idiot!"
+    assert NormalizedText("sc@mm3r").folded == "scammer"
+    assert NormalizedText("price 100 or 3 items!").folded == "price 100 or 3 items!"
+    assert NormalizedText("call 07700900123").folded == "call 07700900123"
+
+
+def test_homoglyphs_and_accents_fold_to_latin():
+    """Cyrillic and Greek look-alikes and accented letters read as plain Latin in folded"""
+    text = NormalizedText("Cаll mе, café")
+    assert text.folded == "call me, cafe"
+    assert text.tokens == ["call", "me", "cafe"]
+    # PII matching runs on text, which keeps the letters as posted
+    assert text.text == "Cаll mе, café"
+
+
+def test_full_width_and_invisible_characters():
+    """NFKC turns full-width forms into ASCII and zero-width characters are dropped"""
+    text = NormalizedText("ｅ​ｍａｉｌ me")
+    assert text.text == "email me"
+    assert text.tokens == ["email", "me"]
+
+
+def test_raw_span_maps_back_to_posted_content():
+    """A span of text maps to the characters of the content it came from"""
+    content = "a​b ０７７"
+    text = NormalizedText(content)
+    assert text.text == "ab 077"
+    start = text.text.index("077")
+    raw_start, raw_end = text.raw_span(start, start + 3)
+    assert content[raw_start:raw_end] == "０７７"
+    assert content[slice(*text.raw_span(0, 2))] == "a​b"
+
+
+def test_sentences_split_on_punctuation_and_newlines():
+    text = NormalizedText("First one. Second!\nThird")
+    assert text.sentences == [["first", "one"], ["second"], ["third"]]
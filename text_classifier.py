@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from text_normalization import normalize_text
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Weights (.npy, memory-mapped) and their metadata (.json) written by `train`
+CLASSIFIER_WEIGHTS = os.environ.get(
+    'CLASSIFIER_WEIGHTS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classifier_weights.npy')
+)
+# Score at which the classifier adds a violation; 1 - threshold clears a rule hit it has to verify
+CLASSIFIER_THRESHOLD = float(os.environ.get('CLASSIFIER_THRESHOLD', 0.75))
+# Hashed feature space (a power of two)
+CLASSIFIER_FEATURES = 1 << 18
+
+
+def metadata_path(weights_path):
+    """Metadata file stored next to a weights file"""
+    return os.path.splitext(weights_path)[0] + '.json'
+
+
+# ================================
+# HASHED FEATURES
+# ================================
+
+def hashed_features(token_lists, n_features=CLASSIFIER_FEATURES):
+    """Word unigram and bigram feature indices for a batch of token lists
+
+    Returns (indices, offsets): the features of list i are
+    indices[offsets[i]:offsets[i + 1]]. crc32 keeps the hashing the same
+    in every process, unlike hash().
+    """
+    mask = n_features - 1
+    indices, offsets = [], [0]
+    for tokens in token_lists:
+        grams = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        indices.extend(zlib.crc32(gram.encode('utf-8')) & mask for gram in grams)
+        offsets.append(len(indices))
+    return np.array(indices, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def feature_rows(offsets):
+    """Row number and L2-normalizing value of every feature"""
+    lengths = np.diff(offsets)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    values = (1.0 / np.sqrt(np.maximum(lengths, 1)))[rows].astype(np.float32)
+    return rows, values
+
+
+# ================================
+# LINEAR CLASSIFIER
+# ================================
+
+class HashingClassifier:
+    """One-vs-rest logistic regression over hashed word n-grams
+
+    weights has one row per hashed feature plus a final bias row, and one
+    column per class. Classes are rule family names from the rules file,
+    so scores map straight onto RuleEngine violations.
+    """
+
+    def __init__(self, weights, classes, version=None):
+        self.weights = weights
+        self.classes = list(classes)
+        self.n_features = weights.shape[0] - 1
+        self.version = version
+
+    def scores(self, texts):
+        """Probability per class for each NormalizedText, shape (len(texts), len(classes))
+
+        Each sentence is scored on its own and a text gets its highest
+        sentence score, so one abusive sentence is not diluted by the
+        neutral ones around it.
+        """
+        sentences, starts = [], []
+        for text in texts:
+            starts.append(len(sentences))
+            sentences.extend(text.sentences)
+        return np.maximum.reduceat(self.sentence_scores(sentences), starts, axis=0) if texts else \
+            np.zeros((0, len(self.classes)))
+
+    def sentence_scores(self, token_lists):
+        """Probability per class for each token list scored as a whole"""
+        indices, offsets = hashed_features(token_lists, self.n_features)
+        logits = np.tile(np.asarray(self.weights[-1], dtype=np.float32), (len(token_lists), 1))
+        if len(indices):
+            _, values = feature_rows(offsets)
+            contributions = self.weights[indices] * values[:, None]
+            # reduceat sums each text's slice; texts without features keep the bias only
+            starts = offsets[:-1]
+            present = starts < offsets[1:]
+            logits[present] += np.add.reduceat(contributions, starts[present], axis=0)
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def save(self, path):
+        """Write the weights and then their metadata next to each other
+
+        Both files are replaced atomically, so processes that still map the
+        old weights keep reading them until they reload.
+        """
+        with open(f"{path}.tmp", 'wb') as weights_file:
+            np.save(weights_file, np.asarray(self.weights, dtype=np.float32))
+        os.replace(f"{path}.tmp", path)
+
+        metadata = {
+            'classes': self.classes,
+            'n_features': self.n_features,
+            'trained_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(f"{metadata_path(path)}.tmp", 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2)
+        os.replace(f"{metadata_path(path)}.tmp", metadata_path(path))
+
+    @classmethod
+    def load(cls, path=CLASSIFIER_WEIGHTS):
+        """Memory-map a saved model, or None when there is none"""
+        if not os.path.exists(path) or not os.path.exists(metadata_path(path)):
+            return None
+        with open(metadata_path(path), 'rb') as metadata_file:
+            raw = metadata_file.read()
+        metadata = json.loads(raw)
+        weights = np.load(path, mmap_mode='r')
+        if weights.shape != (metadata['n_features'] + 1, len(metadata['classes'])):
+            raise ValueError(f"{path}: weights do not match {metadata_path(path)}")
+        return cls(weights, metadata['classes'], hashlib.sha256(raw).hexdigest()[:8])
+
+
+def train(texts, labels, classes, n_features=CLASSIFIER_FEATURES, epochs=300, learning_rate=2.0, l2=1e-4):
+    """Fit a HashingClassifier with full-batch gradient descent
+
+    labels holds one collection of class names per text.
+    """
+    token_lists = [normalize_text(text).tokens for text in texts]
+    indices, offsets = hashed_features(token_lists, n_features)
+    rows, values = feature_rows(offsets)
+    targets = np.array([[name in text_labels for name in classes] for text_labels in labels], dtype=np.float32)
+    weights = np.zeros((n_features + 1, len(classes)), dtype=np.float32)
+    model = HashingClassifier(weights, classes)
+
+    for _ in range(epochs):
+        errors = (model.sentence_scores(token_lists) - targets) / len(texts)
+        gradient = np.zeros_like(weights)
+        np.add.at(gradient, indices, values[:, None] * errors[rows])
+        gradient[-1] = errors.sum(axis=0)
+        gradient[:-1] += l2 * weights[:-1]
+        weights -= learning_rate * gradient
+    return model
+
+
+# ================================
+# COMMAND LINE
+# ================================
+#
+#   python text_classifier.py train classifier_training.jsonl
+#
+# Training data is JSONL: {"content": "...", "labels": ["insult"]}, with
+# "labels": [] for clean posts.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the hashed n-gram classifier used alongside the rules")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    train_parser = subcommands.add_parser('train', help="fit weights from labeled JSONL posts")
+    train_parser.add_argument('data', help="JSONL with 'content' and 'labels' per line")
+    train_parser.add_argument('-o', '--output', default=CLASSIFIER_WEIGHTS, help="weights .npy path")
+    train_parser.add_argument('--epochs', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    with open(args.data, encoding='utf-8') as data_file:
+        examples = [json.loads(line) for line in data_file if line.strip()]
+    texts = [example['content'] for example in examples]
+    labels = [set(example.get('labels', [])) for example in examples]
+    classes = sorted(set().union(*labels))
+    if not classes:
+        print("no labels in the training data", file=sys.stderr)
+        return 1
+
+    model = train(texts, labels, classes, epochs=args.epochs)
+    model.save(args.output)
+
+    predicted = model.scores([normalize_text(text) for text in texts]) >= 0.5
+    for column, name in enumerate(classes):
+        actual = np.array([name in text_labels for text_labels in labels])
+        print(f"{name}: {int(actual.sum())} examples, training accuracy {np.mean(predicted[:, column] == actual):.1%}")
+    print(f"wrote {args.output} and {metadata_path(args.output)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import re
+import unicodedata
+from functools import cached_property, lru_cache
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Posts whose normalized forms are kept per process
+NORMALIZED_CACHE_SIZE = int(os.environ.get('NORMALIZED_CACHE_SIZE', 4096))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# Leetspeak digits and symbols read as letters. They are only folded next
+# to a letter, so prices, phone numbers and a closing "!" stay as they are.
+LEET_LETTERS = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i'}
+# Starts with the character class so the regex engine can skip ahead
+LEET_PATTERN = re.compile(r'[013457@$!](?:(?=[a-z])|(?<=[a-z][013457@$]))')
+
+# Cyrillic and Greek lowercase letters that look like Latin ones
+HOMOGLYPHS = str.maketrans({
+    'а': 'a', 'в': 'b', 'е': 'e', 'һ': 'h', 'і': 'i', 'ј': 'j', 'к': 'k', 'ӏ': 'l', 'м': 'm', 'н': 'h',
+    'о': 'o', 'р': 'p', 'с': 'c', 'ѕ': 's', 'т': 't', 'у': 'y', 'х': 'x', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u',
+    'χ': 'x',
+})
+
+
+def fold_leet(match):
+    return LEET_LETTERS[match.group()]
+
+
+def nfkc_with_offsets(content):
+    """NFKC of content, character by character, without invisible format characters
+
+    Returns (text, starts) where starts[i] is the position in content of
+    the character text[i] came from.
+    """
+    pieces, starts = [], []
+    for position, char in enumerate(content):
+        if char < '\x80':
+            piece = char
+        elif unicodedata.category(char) == 'Cf':
+            # Zero-width spaces and joiners hide words from the matchers
+            piece = ''
+        else:
+            piece = unicodedata.normalize('NFKC', char)
+        pieces.append(piece)
+        starts.extend([position] * len(piece))
+    return ''.join(pieces), starts
+
+
+# ================================
+# SHARED NORMALIZED FORMS
+# ================================
+
+class NormalizedText:
+    """The forms of one post's content that every detector matches against
+
+    raw      the content as posted
+    text     NFKC without format characters, case kept (PII)
+    lower    text lowercased (usernames and links)
+    folded   lower without accents, with homoglyphs and leetspeak read as
+             plain letters (keywords and profanity)
+    tokens   words of folded, and sentences the words of each sentence
+
+    ASCII content, which is most posts, skips the Unicode work: its text
+    is the raw content itself.
+    """
+
+    def __init__(self, content):
+        self.raw = content
+        if content.isascii():
+            self.text = content
+            self.starts = None
+            self.lower = content.lower()
+            folded = self.lower
+        else:
+            self.text, self.starts = nfkc_with_offsets(content)
+            self.lower = self.text.lower()
+            folded = ''.join(
+                char for char in unicodedata.normalize('NFKD', self.lower) if not unicodedata.combining(char)
+            ).translate(HOMOGLYPHS)
+        self.folded = LEET_PATTERN.sub(fold_leet, folded)
+
+    @cached_property
+    def tokens(self):
+        return TOKEN_PATTERN.findall(self.folded)
+
+    @cached_property
+    def sentences(self):
+        return [TOKEN_PATTERN.findall(sentence) for sentence in SENTENCE_BREAK.split(self.folded)]
+
+    def raw_span(self, start, end):
+        """Span of raw that text[start:end] came from"""
+        if self.starts is None or start >= end:
+            return start, end
+        return self.starts[start], self.starts[end - 1] + 1
+
+
+@lru_cache(maxsize=NORMALIZED_CACHE_SIZE)
+def normalize_text(content):
+    """Normalized forms of content, computed once per process for recent posts"""
+    return NormalizedText(content)